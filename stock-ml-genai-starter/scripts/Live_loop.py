@@ -1,91 +1,111 @@
-import os
 import time
-import pandas as pd
-import joblib
 from datetime import datetime
 
+from ingest import TailReader
+from bus import BusReader
+from indicators import IndicatorEngine
+from registry import ModelWatcher
+from portfolio import Portfolio
+from trade_log import TradeLogWriter
+from latency import LatencyRecorder
+
 # --- Config ---
 symbol = 'AAPL'
 capital = 10_000
 risk_per_trade = 0.01
 stop_loss_pct = 0.005
-features = ['Close', 'Volume', 'SMA_20', 'SMA_50', 'RSI_14', 'MACD', 'MACD_signal', 'MACD_hist']
-
-model_path = 'models/price_direction_rf.pkl'
-data_path = f'data/{symbol}_features.csv'
+data_path = f'data/{symbol}_1min.csv'
 log_folder = 'trade_logs'
+poll_seconds = 1   # cheap now: a poll only reads bytes appended since the last one
+use_bus = False    # take bars from the shared-memory bus (fetch_data.py --bus) instead of tailing the CSV
+
+# Buffered writer; creates the log folder if missing
+trade_log = TradeLogWriter(log_folder)
+
+# Per-stage timings -> trade_logs/latency_live_loop.json (PROFILE=1 or a trade_logs/PROFILE file samples stacks)
+metrics = LatencyRecorder('live_loop', log_folder)
 
-# Create log folder if missing
-os.makedirs(log_folder, exist_ok=True)
+# Current registry model; new versions are loaded & warmed in the background and swapped between ticks
+watcher = ModelWatcher()
+print(f"✅ Loaded model: {watcher.version}")
 
-# Load model once
-model = joblib.load(model_path)
-print(f"✅ Loaded model: {model_path}")
+# --- Position book: net qty / avg entry / realized PnL / stop per symbol
+book = Portfolio([symbol])
 
-# --- Initialize positions list
-positions = []   # Each: {'entry_price': float, 'qty': int, 'action': 'BUY'/'SELL'}
+# --- Bars are tailed from the raw CSV and features updated bar by bar
+reader = BusReader(symbol) if use_bus else TailReader(data_path)
+engine = IndicatorEngine()
 
 # --- Live loop ---
 while True:
+    tick_start = time.perf_counter_ns()
     try:
+        with metrics.span('poll', symbol):
+            new_bars = reader.poll()
+        with metrics.span('features', symbol):
+            for ts, values in new_bars:
+                engine.update(ts, *reader.ohlcv(values))
+        if not new_bars or not engine.ready:
+            reader.wait(poll_seconds)
+            continue
+
         print(f"\n=== {datetime.now()} | Predicting for {symbol} ===")
 
-        # Load latest data
-        df = pd.read_csv(data_path, index_col=0, parse_dates=True)
-        latest = df.iloc[-1:]
-        current_price = latest['Close'].values[0]
-
-        # Predict
-        pred = model.predict(latest[features])[0]
-        proba = model.predict_proba(latest[features])[0]
-
-        # Position sizing
-        dollar_risk = capital * risk_per_trade
-        stop_loss_amount = current_price * stop_loss_pct
-        qty = max(int(dollar_risk / stop_loss_amount), 1)
-
-        # Decide action
-        if pred == 1 and proba[1] > 0.6:
-            action = "BUY"
-            stop_price = current_price * (1 - stop_loss_pct)
-        elif pred == 0 and proba[0] > 0.6:
-            action = "SELL"
-            stop_price = current_price * (1 + stop_loss_pct)
-        else:
-            action = "HOLD"
-            stop_price = None
-
-        # --- Record new position if BUY or SELL
-        if action in ["BUY", "SELL"]:
-            positions.append({
-                'entry_price': current_price,
-                'qty': qty,
-                'action': action
-            })
-
-        # --- Compute PnL on open positions
-        total_pnl = 0
-        for pos in positions:
-            if pos['action'] == "BUY":
-                pnl = (current_price - pos['entry_price']) * pos['qty']
-            elif pos['action'] == "SELL":
-                pnl = (pos['entry_price'] - current_price) * pos['qty']
+        # One model version for the whole tick; it picks its own columns from the engine row
+        model = watcher.active
+        current_price = engine.row[0]   # FEATURE_COLUMNS[0] == 'Close'
+
+        # --- Mark the open position and close it if the new price crossed its stop
+        with metrics.span('stops', symbol):
+            book.mark({symbol: current_price})
+            for sym, stop_qty, stop_pnl in book.stop_out():
+                print(f"🛑 Stop hit: closed {abs(stop_qty)} @ {current_price:.2f} | Realized: ${stop_pnl:.2f}")
+                trade_log.log(sym, current_price, "STOP", abs(stop_qty), pnl=book.total_pnl())
+
+        # Predict (one forest pass; the class is the argmax of the probabilities, as in model.predict)
+        with metrics.span('predict', symbol):
+            proba = model.predict_proba(engine.row)[0]
+            pred = model.classes_[proba.argmax()]
+
+        with metrics.span('decide', symbol):
+            # Position sizing
+            dollar_risk = capital * risk_per_trade
+            stop_loss_amount = current_price * stop_loss_pct
+            qty = max(int(dollar_risk / stop_loss_amount), 1)
+
+            # Decide action
+            if pred == 1 and proba[1] > 0.6:
+                action = "BUY"
+                stop_price = current_price * (1 - stop_loss_pct)
+            elif pred == 0 and proba[0] > 0.6:
+                action = "SELL"
+                stop_price = current_price * (1 + stop_loss_pct)
             else:
-                pnl = 0
-            total_pnl += pnl
+                action = "HOLD"
+                stop_price = None
+
+            # --- Fill BUY / SELL into the book (netted against the open position)
+            if action in ["BUY", "SELL"]:
+                book.fill(symbol, qty if action == "BUY" else -qty, current_price, stop_price)
+
+            # --- PnL: realized + open position marked at the current price
+            total_pnl = book.total_pnl()
 
         # Print info
         print(f"Price: {current_price:.2f} | Pred: {pred} | Prob: {proba}")
         print(f"Action: {action} | Qty: {qty} | Stop Loss: {stop_price:.2f}" if stop_price else f"Action: {action}")
-        print(f"📊 Current Unrealized PnL: ${total_pnl:.2f} across {len(positions)} open positions")
+        print(f"📊 PnL: ${total_pnl:.2f} | Position: {book.position(symbol)} @ {book.avg_price[0]:.2f}")
+
+        # Log (queued; written in batches by the writer thread)
+        with metrics.span('log', symbol):
+            trade_log.log(symbol, current_price, action, qty, stop_price, total_pnl, proba[1])
 
-        # Log to file
-        log_filename = datetime.now().strftime(f"{log_folder}/trades_%Y-%m-%d.txt")
-        log_entry = f"{datetime.now()}, {symbol}, {current_price:.2f}, {action}, {qty}, {stop_price}, {total_pnl:.2f}\n"
-        with open(log_filename, "a", encoding="utf-8") as f:
-            f.write(log_entry)
+        # Whole decision tick, bar arrival to logged decision
+        metrics.record('tick', (time.perf_counter_ns() - tick_start) / 1e6, symbol)
 
     except Exception as e:
+        metrics.error('tick', symbol)
         print(f"⚠️ Error: {e}")
 
-    time.sleep(5)  # wait 5 seconds before next iteration
+    # The bus wakes up as soon as the next bar is published; the CSV is polled
+    reader.wait(poll_seconds)
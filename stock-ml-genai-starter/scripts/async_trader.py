@@ -0,0 +1,145 @@
+# Asyncio live trading runtime
+#
+# Every symbol gets two tasks: an ingestion task that tails its 1-minute CSV
+# on a fixed cadence and pushes new bars onto a queue, and a decision task
+# that updates the symbol's indicator engine and trades on the newest bar.
+# File reads and model inference run in executors, so one slow symbol never
+# holds up the others; decision tasks share an InferenceBatcher that turns
+# all requests arriving within a few ms into a single predict_proba call.
+# The model comes from the registry and is hot-swapped between batches; rows
+# travel as full engine rows and each batch uses its model's column map.
+#
+# Usage: python scripts/async_trader.py
+import os
+import asyncio
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import strategy
+from ingest import TailReader
+from indicators import IndicatorEngine
+from registry import ModelWatcher
+from trade_log import TradeLogWriter
+
+# --- Config ---
+SYMBOLS = ['AAPL', 'AMZN', 'GOOGL', 'MSFT', 'SPY']
+DATA_FOLDER = 'data'
+LOG_FOLDER = 'trade_logs'
+TICK_SECONDS = 1.0        # poll cadence per symbol
+BATCH_WINDOW = 0.005      # how long the batcher waits for more requests
+
+
+class Cadence:
+    """Fixed-rate ticker: sleeps until the next slot instead of a constant amount, so work time doesn't accumulate as drift."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next = None
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self.next is None:
+            self.next = now
+        self.next += self.interval
+        if self.next < now:
+            # Overran by more than a tick: skip the missed slots instead of bursting
+            self.next += ((now - self.next) // self.interval + 1) * self.interval
+        await asyncio.sleep(self.next - now)
+
+
+class InferenceBatcher:
+    def __init__(self, watcher, executor, window=BATCH_WINDOW):
+        self.watcher = watcher
+        self.executor = executor
+        self.window = window
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+
+    async def predict_up(self, row):
+        # P(up) for one engine row
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while (timeout := deadline - loop.time()) > 0:
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            model = self.watcher.active
+            rows = np.vstack([row for row, _ in batch])
+            self.batches += 1
+            self.rows += len(rows)
+            try:
+                probs = await loop.run_in_executor(self.executor, model.predict_proba, rows)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), proba in zip(batch, probs[:, model.up_idx]):
+                future.set_result(proba)
+
+
+async def ingest(symbol, reader, queue, io_executor):
+    loop = asyncio.get_running_loop()
+    cadence = Cadence(TICK_SECONDS)
+    while True:
+        try:
+            for bar in await loop.run_in_executor(io_executor, reader.poll):
+                await queue.put(bar)
+        except Exception as e:
+            print(f"⚠️ {symbol} ingest error: {e}")
+        await cadence.wait()
+
+
+async def decide(symbol, reader, queue, batcher, trade_log):
+    engine = IndicatorEngine()
+    while True:
+        ts, values = await queue.get()
+        engine.update(ts, *reader.ohlcv(values))
+        # Only the newest bar is traded; a backlog is just folded into the features
+        if not queue.empty() or not engine.ready:
+            continue
+        try:
+            p_up = await batcher.predict_up(engine.row)
+            price = engine.row[0]
+            action, qty, stop_price = strategy.decide(price, p_up)
+            print(f"{datetime.now()} | {symbol} | {price:.2f} | P(up)={p_up:.2f} | {action}")
+            trade_log.log(symbol, price, action, qty, stop_price, proba=p_up)
+        except Exception as e:
+            print(f"⚠️ {symbol} decision error: {e}")
+
+
+async def main():
+    trade_log = TradeLogWriter(LOG_FOLDER)
+    watcher = ModelWatcher()
+    print(f"✅ Loaded model: {watcher.version} | {len(SYMBOLS)} symbols")
+
+    io_executor = ThreadPoolExecutor(max_workers=min(32, len(SYMBOLS) + 1), thread_name_prefix='io')
+    # numpy/sklearn release the GIL during prediction, so a worker thread keeps the loop free
+    model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model')
+    batcher = InferenceBatcher(watcher, model_executor)
+
+    tasks = [asyncio.create_task(batcher.run())]
+    for symbol in SYMBOLS:
+        reader = TailReader(os.path.join(DATA_FOLDER, f"{symbol}_1min.csv"))
+        queue = asyncio.Queue()
+        tasks.append(asyncio.create_task(ingest(symbol, reader, queue, io_executor)))
+        tasks.append(asyncio.create_task(decide(symbol, reader, queue, batcher, trade_log)))
+    await asyncio.gather(*tasks)
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Stopped.")
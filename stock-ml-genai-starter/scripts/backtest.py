@@ -1 +1,95 @@
-# Simple backtest logic
\ No newline at end of file
+# Vectorized backtest of the price_direction_rf strategy
+#
+# Same rules as Live_loop.py / infer_and_trade.py: act when a class
+# probability is above the threshold, size the trade so the stop loses
+# risk_per_trade of capital, stop 0.5% away. Each bar's decision is held
+# until the next bar's close (or until the stop is hit inside that bar),
+# and everything is computed with whole-array NumPy operations.
+import os
+import numpy as np
+import pandas as pd
+
+import strategy
+from feature_store import load_features
+from forest import load_model
+from indicators import MODEL_FEATURES
+
+symbols = ['AAPL', 'AMZN', 'GOOGL', 'MSFT', 'SPY', 'EURUSD=X', 'GBPUSD=X']
+features = list(MODEL_FEATURES)
+model_path = 'models/price_direction_rf.pkl'
+out_folder = 'backtests'
+
+
+def predict_up(model, df):
+    # P(price goes up) for every row in one predict_proba call, on the columns the model was trained on
+    trained = getattr(model, 'feature_names_in_', None)
+    proba = model.predict_proba(df[features if trained is None else list(trained)])
+    return proba[:, list(model.classes_).index(1)]
+
+
+def run_backtest(df, proba_up, threshold=strategy.threshold, capital=strategy.capital,
+                 risk_per_trade=strategy.risk_per_trade, stop_loss_pct=strategy.stop_loss_pct):
+    close = df['Close'].to_numpy(dtype=np.float64)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    open_ = df['Open'].to_numpy(dtype=np.float64)
+
+    side = strategy.signals(proba_up, threshold).astype(np.int64)
+    qty = strategy.position_size(close, capital, risk_per_trade, stop_loss_pct)
+    units = side * qty
+
+    # --- PnL of the position opened at bar t over bar t+1
+    entry, side_t, qty_t = close[:-1], side[:-1], qty[:-1]
+    stop_price = entry * (1 - side_t * stop_loss_pct)
+    long_stop = (side_t == 1) & (low[1:] <= stop_price)
+    short_stop = (side_t == -1) & (high[1:] >= stop_price)
+    stopped = long_stop | short_stop
+    # A gap through the stop fills at the open, not at the stop
+    stop_fill = np.where(long_stop, np.minimum(stop_price, open_[1:]), np.maximum(stop_price, open_[1:]))
+    exit_price = np.where(stopped, stop_fill, close[1:])
+    pnl = np.zeros(len(close))
+    pnl[1:] = side_t * qty_t * (exit_price - entry)
+
+    # --- Equity & drawdown
+    equity = capital + np.cumsum(pnl)
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1
+
+    # --- Turnover: traded notional, a stopped position is already flat at the next decision
+    held = units.copy()
+    held[:-1][stopped] = 0
+    traded = np.abs(units - np.concatenate(([0], held[:-1])))
+    turnover = float(np.sum(traded * close) / capital)
+
+    trades = side_t != 0
+    curve = pd.DataFrame({'equity': equity, 'drawdown': drawdown, 'position': units, 'pnl': pnl},
+                         index=df.index)
+    stats = {
+        'bars': len(close),
+        'trades': int(trades.sum()),
+        'hit_rate': float((pnl[1:][trades] > 0).mean()) if trades.any() else np.nan,
+        'stops_hit': int(stopped.sum()),
+        'total_pnl': float(pnl.sum()),
+        'return_pct': float((equity[-1] / capital - 1) * 100),
+        'max_drawdown_pct': float(drawdown.min() * 100),
+        'turnover': turnover,
+    }
+    return curve, stats
+
+
+if __name__ == '__main__':
+    os.makedirs(out_folder, exist_ok=True)
+    model = load_model(model_path)
+    print(f"✅ Loaded model: {model_path}")
+
+    results = {}
+    for symbol in symbols:
+        df = load_features(symbol)
+        curve, stats = run_backtest(df, predict_up(model, df))
+        curve.to_csv(f"{out_folder}/{symbol}_equity.csv")
+        results[symbol] = stats
+
+    report = pd.DataFrame.from_dict(results, orient='index')
+    print(report.round(4).to_string())
+    report.to_csv(f"{out_folder}/summary.csv")
+    print(f"✅ Saved equity curves and summary to {out_folder}/")
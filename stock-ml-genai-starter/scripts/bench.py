@@ -0,0 +1,325 @@
+# Benchmark suite for the pipeline (features -> model -> inference -> backtest -> logs)
+#
+# Everything runs on synthetic OHLCV bars (a geometric random walk with
+# consistent open/high/low and lognormal volume) in a temp folder, so the
+# numbers don't depend on what is in data/ and the size is a knob: the
+# "small" preset matches the current ~180-bar files, "large" goes to millions
+# of bars and hundreds of symbols.
+#
+# Each benchmark is run --repeat times and the median wall time is kept.
+# Results are appended to benchmarks/{size}.jsonl together with the git
+# commit, so runs can be compared across commits; --compare checks the run
+# against the last one from another commit (or --baseline REV) and exits
+# with status 1 if any benchmark got slower than --tolerance. The panel
+# feature run is also checked against the per-symbol streaming engine on a
+# gappy grid, in chunks; a mismatch fails the run as well.
+#
+# Usage: python scripts/bench.py [--size small|medium|large] [--only features,predict] [--compare]
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import registry
+from backtest import run_backtest
+from feature_store import FeatureStore
+from indicators import IndicatorEngine, MODEL_FEATURES, panel_features
+from trade_log import TradeLogWriter, TradeLogReader
+
+RESULTS_FOLDER = 'benchmarks'
+PARITY_SYMBOLS = 5        # symbols of the panel parity check (the streaming engine is slow on big panels)
+PARITY_RTOL = 1e-6        # allowed relative difference; the streaming std drifts ~1e-8 over 1e5+ bars
+
+# bars: one symbol's history (stream features, feature store, backtest)
+# symbols x panel_bars: the panel feature run; symbols is also the live cycle batch
+# batch_rows: rows per batch inference call (the deep forests cost ~0.2 ms/row)
+SIZES = {
+    'small': {'bars': 180, 'symbols': 5, 'panel_bars': 180, 'train_rows': 180, 'batch_rows': 180, 'log_rows': 1_000},
+    'medium': {'bars': 100_000, 'symbols': 100, 'panel_bars': 5_000, 'train_rows': 20_000, 'batch_rows': 10_000,
+               'log_rows': 100_000},
+    'large': {'bars': 2_000_000, 'symbols': 500, 'panel_bars': 20_000, 'train_rows': 50_000, 'batch_rows': 100_000,
+              'log_rows': 1_000_000},
+}
+
+
+# --- Synthetic data
+def synthetic_bars(n_bars, seed=0, start='2024-01-02 14:30', freq='1min', price=100.0, vol=0.001):
+    # 1-minute OHLCV in the column order of the yfinance CSVs
+    rng = np.random.default_rng(seed)
+    close = price * np.exp(np.cumsum(rng.normal(0, vol, n_bars)))
+    open_ = np.concatenate(([price], close[:-1])) * np.exp(rng.normal(0, vol / 4, n_bars))
+    wick = np.abs(rng.normal(0, vol / 2, (2, n_bars)))
+    index = pd.date_range(start, periods=n_bars, freq=freq, tz='UTC', name='Datetime')
+    return pd.DataFrame({
+        'Close': close,
+        'High': np.maximum(open_, close) * (1 + wick[0]),
+        'Low': np.minimum(open_, close) * (1 - wick[1]),
+        'Open': open_,
+        'Volume': rng.lognormal(10, 1, n_bars).round(),
+    }, index=index)
+
+
+def synthetic_panel(n_symbols, n_bars, seed=0, missing=0.0):
+    # symbol -> bars; `missing` drops that fraction of each symbol's bars (gaps on the shared grid)
+    frames = {}
+    for j in range(n_symbols):
+        df = synthetic_bars(n_bars, seed=seed + j, price=20.0 + 10 * j)
+        if missing:
+            keep = np.random.default_rng(seed + j).random(n_bars) >= missing
+            df = df[keep]
+        frames[f"SYM{j:03d}"] = df
+    return frames
+
+
+def synthetic_trades(writer, n_rows, symbols, seed=0):
+    # Trade log records through the buffered writer, one second apart
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 2, 14, 30)
+    prices = 100 + rng.normal(0, 1, n_rows).cumsum()
+    pnl = rng.normal(0, 5, n_rows).cumsum()
+    actions = np.array(['BUY', 'SELL', 'HOLD'])[rng.integers(0, 3, n_rows)]
+    for i in range(n_rows):
+        writer.log(symbols[i % len(symbols)], prices[i], actions[i], 10, pnl=pnl[i], proba=0.5,
+                   time=start + pd.Timedelta(seconds=i))
+
+
+# --- Correctness
+def panel_parity(frames, chunk_rows=None):
+    # Largest relative difference between panel_features and one IndicatorEngine
+    # per symbol; inf if they disagree on which rows are ready
+    chunks = list(panel_features(frames, chunk_rows))
+    worst = 0.0
+    for symbol, bars in frames.items():
+        panel = pd.concat([chunk[symbol] for chunk in chunks])
+        ref = IndicatorEngine().seed(bars)
+        if not panel.index.equals(ref.index):
+            return float('inf')
+        a, b = panel.to_numpy(dtype=np.float64), ref.to_numpy(dtype=np.float64)
+        worst = max(worst, float(np.max(np.abs(a - b) / np.maximum(np.abs(b), 1.0), initial=0.0)))
+    return worst
+
+
+# --- Timing
+def measure(fn, repeat=3, number=1, setup=None):
+    # Seconds per call for each repeat; setup() runs untimed before every repeat
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+    return times
+
+
+def _result(times, items, unit):
+    median = float(np.median(times))
+    return {'median_s': median, 'best_s': float(min(times)), 'items': items, 'unit': unit,
+            'rate': items / median if median else float('inf')}
+
+
+def run(cfg, repeat=3, only=None, work=None):
+    results = {}
+
+    def wanted(name):
+        return not only or any(name.startswith(p) for p in only)
+
+    def add(name, times, items, unit):
+        results[name] = r = _result(times, items, unit)
+        print(f"  {name:<22} {r['median_s'] * 1e3:>12.3f} ms   {r['rate']:>14,.0f} {unit}/s")
+
+    bars = synthetic_bars(cfg['bars'])
+
+    # Features: streaming engine (one symbol, bar by bar) and the vectorized panel
+    if wanted('features_stream'):
+        add('features_stream', measure(lambda: IndicatorEngine().seed(bars), repeat), len(bars), 'bars')
+    if wanted('features_panel'):
+        frames = synthetic_panel(cfg['symbols'], cfg['panel_bars'], missing=0.01)
+        n = sum(len(f) for f in frames.values())
+        add('features_panel', measure(lambda: list(panel_features(frames)), repeat), n, 'bars')
+        del frames
+        gappy = synthetic_panel(PARITY_SYMBOLS, cfg['panel_bars'], seed=1, missing=0.1)
+        parity = results['features_panel']['parity'] = panel_parity(gappy, max(cfg['panel_bars'] // 4, 1))
+        print(f"  {'panel parity':<22} {parity:>12.2e} max rel diff vs streaming engine")
+    features = next(panel_features({'SYM': bars}))['SYM']
+
+    # Feature store round trip
+    if wanted('store'):
+        store = FeatureStore(os.path.join(work, 'store'))
+        add('store_write', measure(lambda: store.write('features', 'SYM', features), repeat), len(features), 'rows')
+        add('store_read', measure(lambda: store.read('features', 'SYM', columns=list(MODEL_FEATURES)), repeat),
+            len(features), 'rows')
+
+    need_model = any(wanted(p) for p in ('model_load', 'predict', 'backtest'))
+    if need_model:
+        import joblib
+        import training
+        from sklearn.ensemble import RandomForestClassifier
+
+        train = training.add_target(features.iloc[:cfg['train_rows']].copy())
+        model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
+        model.fit(train[list(MODEL_FEATURES)], train['target'])
+        root = os.path.join(work, 'registry')
+        version = registry.publish(model, MODEL_FEATURES, root=root)
+        pkl_path = os.path.join(root, registry.DEFAULT_NAME, version, 'model.pkl')
+
+        if wanted('model_load'):
+            add('model_load_pickle', measure(lambda: joblib.load(pkl_path), repeat), 1, 'models')
+            add('model_load_registry', measure(lambda: registry.load(root=root), repeat), 1, 'models')
+
+        bound = registry.load(root=root)
+        registry.warm(bound)
+        rows = features.to_numpy(dtype=np.float64)
+        if wanted('predict'):
+            # One tick of Live_loop.py, one cycle of live_trader.py, and a whole history
+            add('predict_single', measure(lambda: bound.predict_proba(rows[-1]), repeat, number=200), 1, 'rows')
+            cycle = np.resize(rows, (cfg['symbols'], rows.shape[1]))
+            add('predict_cycle', measure(lambda: bound.predict_proba(cycle), repeat, number=20), len(cycle), 'rows')
+            batch = rows[:cfg['batch_rows']]
+            add('predict_batch', measure(lambda: bound.predict_proba(batch), repeat), len(batch), 'rows')
+
+        if wanted('backtest'):
+            # Backtest cost doesn't depend on the model: predict a batch and tile it over the history
+            proba_up = np.resize(bound.predict_proba(rows[:cfg['batch_rows']])[:, bound.up_idx], len(rows))
+            add('backtest', measure(lambda: run_backtest(features, proba_up), repeat),
+                len(features), 'bars')
+
+    # Trade log: buffered writes, then a cold dashboard load (parse + totals + chart series)
+    if wanted('log'):
+        log_folder = os.path.join(work, 'trade_logs')
+        symbols = [f"SYM{j:03d}" for j in range(cfg['symbols'])]
+
+        def write_logs():
+            writer = TradeLogWriter(log_folder)
+            synthetic_trades(writer, cfg['log_rows'], symbols)
+            writer.close()
+
+        def load_logs():
+            reader = TradeLogReader(log_folder)
+            reader.refresh()
+            reader.cum_pnl_series()
+
+        add('log_write', measure(write_logs, repeat, setup=lambda: shutil.rmtree(log_folder, ignore_errors=True)),
+            cfg['log_rows'], 'rows')
+        add('log_load', measure(load_logs, repeat), cfg['log_rows'], 'rows')
+
+    return results
+
+
+# --- Stored runs
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, check=True).stdout.strip()
+        return commit, bool(dirty)
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def load_runs(size, folder=RESULTS_FOLDER):
+    path = os.path.join(folder, f"{size}.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_run(run_record, folder=RESULTS_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, f"{run_record['size']}.jsonl"), 'a') as f:
+        f.write(json.dumps(run_record) + '\n')
+
+
+def find_baseline(runs, commit, rev=None):
+    # Last run of `rev` (commit prefix), or the last run from any other commit
+    for r in reversed(runs):
+        if (r['commit'] or '').startswith(rev) if rev else r['commit'] != commit:
+            return r
+    return None
+
+
+def compare(current, baseline, tolerance=0.1):
+    # Table of median times vs the baseline; names of the benchmarks slower than 1 + tolerance
+    rows, regressions = [], []
+    for name, r in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = r['median_s'] / base['median_s'] if base['median_s'] else np.nan
+        rows.append({'benchmark': name, 'baseline_ms': base['median_s'] * 1e3,
+                     'current_ms': r['median_s'] * 1e3, 'ratio': ratio})
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return pd.DataFrame(rows), regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks on synthetic OHLCV data")
+    parser.add_argument('--size', choices=list(SIZES), default='small')
+    parser.add_argument('--bars', type=int, default=None, help="override the preset's bars per symbol")
+    parser.add_argument('--symbols', type=int, default=None, help="override the preset's symbol count")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', default=None, help="comma-separated benchmark name prefixes")
+    parser.add_argument('--compare', action='store_true', help="compare with the last run from another commit")
+    parser.add_argument('--baseline', default=None, help="commit to compare with (implies --compare)")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="allowed slowdown before failing, 0.1 = 10%%")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    cfg = dict(SIZES[args.size])
+    if args.bars:
+        cfg['bars'] = cfg['panel_bars'] = args.bars
+        cfg['train_rows'] = min(cfg['train_rows'], args.bars)
+        cfg['batch_rows'] = min(cfg['batch_rows'], args.bars)
+    if args.symbols:
+        cfg['symbols'] = args.symbols
+    only = args.only.split(',') if args.only else None
+    # A run with overridden sizes is only comparable with runs of the same shape
+    size = args.size if cfg == SIZES[args.size] else f"{args.size}-{cfg['bars']}x{cfg['symbols']}"
+
+    commit, dirty = git_commit()
+    print(f"=== Benchmarks: {size} {cfg} | commit {commit}{'+dirty' if dirty else ''} ===")
+    with tempfile.TemporaryDirectory(prefix='bench_') as work:
+        results = run(cfg, args.repeat, only, work)
+
+    record = {
+        'size': size, 'config': cfg, 'commit': commit, 'dirty': dirty,
+        'time': datetime.now().isoformat(timespec='seconds'), 'repeat': args.repeat,
+        'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        'machine': platform.node(), 'cpus': os.cpu_count(), 'results': results,
+    }
+
+    regressions = []
+    parity = results.get('features_panel', {}).get('parity', 0.0)
+    if parity > PARITY_RTOL:
+        regressions.append('features_panel (parity)')
+    if args.compare or args.baseline:
+        baseline = find_baseline(load_runs(size), commit, args.baseline)
+        if baseline is None:
+            print(f"⚠️ No stored {size} run to compare with")
+        else:
+            if baseline['machine'] != record['machine']:
+                print(f"⚠️ Baseline was recorded on {baseline['machine']}, numbers may not be comparable")
+            table, slower = compare(record, baseline, args.tolerance)
+            regressions += slower
+            print(f"\nvs {baseline['commit']} ({baseline['time']}):")
+            print(table.round(3).to_string(index=False))
+
+    if not args.no_save:
+        save_run(record)
+        print(f"✅ Saved results to {RESULTS_FOLDER}/{size}.jsonl")
+    if regressions:
+        print(f"❌ Slower than baseline by more than {args.tolerance:.0%} or wrong: {', '.join(regressions)}")
+        sys.exit(1)
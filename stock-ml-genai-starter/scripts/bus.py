@@ -0,0 +1,319 @@
+# Shared-memory market data bus
+#
+# One shared-memory segment per symbol (/dev/shm/mdbus_{symbol}): a 64-byte
+# header and a ring of `capacity` fixed-width RECORD_DTYPE rows (sequence
+# number, ns timestamp, BAR_COLUMNS values). The single publisher of a
+# symbol writes a record, then the record's sequence number, then bumps the
+# header's sequence counter. Any number of subscribers, in any process,
+# compare that counter with the last sequence they consumed and get the new
+# records as numpy views straight into the segment: no parsing, no copy, no
+# file system. A subscriber that fell more than `capacity` bars behind gets
+# the overwritten bars reported as lost, and the per-record sequence numbers
+# catch a slot the publisher reused while it was being read.
+#
+# Segments outlive the processes that use them, so fetch_data.py --bus can
+# run once a minute and the live loops keep their place; remove them with
+# `python scripts/bus.py unlink`.
+#
+# Usage: python scripts/bus.py status | unlink [SYMBOL ...]
+import os
+import re
+import time
+import argparse
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+import pandas as pd
+
+from resample import BAR_COLUMNS
+
+BUS_PREFIX = 'mdbus'
+CAPACITY = 4096           # bars per symbol ring
+SPIN_SECONDS = 50e-6      # wait() busy-polls this long before it starts sleeping
+MAX_SLEEP = 2e-3          # longest sleep between polls once wait() backs off
+MAGIC = 0x4D44425553      # header tag: segment initialised
+
+HEADER_DTYPE = np.dtype([('magic', 'i8'), ('capacity', 'i8'), ('seq', 'i8'), ('pad', 'i8', 5)])
+RECORD_DTYPE = np.dtype([('seq', 'i8'), ('time', 'i8'), ('values', 'f8', (len(BAR_COLUMNS),))])
+_EMPTY = np.empty(0, dtype=RECORD_DTYPE)
+
+
+def _wait_for(ready, timeout, spin=SPIN_SECONDS, max_sleep=MAX_SLEEP):
+    # Poll ready() until it's true or timeout seconds pass: busy-poll for `spin`
+    # seconds (a bar right after the last one is picked up in microseconds),
+    # then sleep with exponential backoff up to max_sleep so an idle wait
+    # doesn't burn a core
+    now = time.perf_counter()
+    deadline, spin_until = now + timeout, now + spin
+    sleep = spin
+    while not ready():
+        now = time.perf_counter()
+        if now >= deadline:
+            return False
+        if now >= spin_until:
+            time.sleep(min(sleep, deadline - now))
+            sleep = min(sleep * 2, max_sleep)
+    return True
+
+
+def segment_name(symbol, prefix=BUS_PREFIX):
+    return f"{prefix}_{re.sub(r'[^A-Za-z0-9]', '_', symbol)}"
+
+
+def _shm(name, create=False, size=0):
+    # Segments aren't owned by the process that opened them: keep the resource tracker from unlinking them at exit
+    try:
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+    except TypeError:   # Python < 3.13
+        shm = shared_memory.SharedMemory(name, create=create, size=size)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class Ring:
+    """Header + record views over one symbol's segment."""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((), HEADER_DTYPE, buffer=shm.buf)
+        self.capacity = int(self.header['capacity'])
+        self.records = np.ndarray((self.capacity,), RECORD_DTYPE, buffer=shm.buf, offset=HEADER_DTYPE.itemsize)
+
+    @classmethod
+    def open(cls, symbol, prefix=BUS_PREFIX, capacity=None):
+        # Attach to the symbol's segment; with a capacity, create it if it doesn't exist yet
+        name = segment_name(symbol, prefix)
+        if capacity:
+            try:
+                shm = _shm(name, create=True, size=HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize)
+                header = np.ndarray((), HEADER_DTYPE, buffer=shm.buf)
+                header['capacity'], header['seq'] = capacity, 0
+                header['magic'] = MAGIC   # last: subscribers ignore the segment until it is set
+                return cls(shm)
+            except FileExistsError:
+                pass
+        try:
+            shm = _shm(name)
+        except ValueError:
+            # Created but not sized yet by the publisher
+            raise FileNotFoundError(f"{name}: segment not initialised yet")
+        if int(np.ndarray((), HEADER_DTYPE, buffer=shm.buf)['magic']) != MAGIC:
+            shm.close()
+            raise FileNotFoundError(f"{name}: segment not initialised yet")
+        return cls(shm)
+
+    @property
+    def seq(self):
+        return int(self.header['seq'])
+
+    def close(self):
+        self.header = self.records = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass   # a consumer still holds record views; the mapping goes with them
+
+
+class BusPublisher:
+    def __init__(self, symbols=(), capacity=CAPACITY, prefix=BUS_PREFIX):
+        self.capacity = capacity
+        self.prefix = prefix
+        self.rings = {}
+        for symbol in symbols:
+            self.ring(symbol)
+
+    def ring(self, symbol):
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = Ring.open(symbol, self.prefix, self.capacity)
+        return ring
+
+    def publish(self, symbol, ts, values):
+        # One bar; values in BAR_COLUMNS order (or the first len(values) of them)
+        self.publish_many(symbol, np.array([pd.Timestamp(ts).value]), np.atleast_2d(values))
+
+    def publish_many(self, symbol, times, values):
+        # Bars with int64 ns timestamps, rows x BAR_COLUMNS values; returns the last sequence number
+        ring = self.ring(symbol)
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[1] < len(BAR_COLUMNS):
+            pad = np.full((len(values), len(BAR_COLUMNS) - values.shape[1]), np.nan)
+            pad[:, BAR_COLUMNS.index('Ticks') - values.shape[1]] = 1.0
+            values = np.hstack([values, pad])
+        seq0, n = ring.seq, len(values)
+        keep = min(n, ring.capacity)   # a burst longer than the ring only leaves its tail
+        seqs = np.arange(seq0 + n - keep + 1, seq0 + n + 1)
+        slots = (seqs - 1) % ring.capacity
+        rec = ring.records
+        rec['seq'][slots] = -1         # in progress
+        rec['time'][slots] = np.asarray(times, dtype=np.int64)[n - keep:]
+        rec['values'][slots] = values[n - keep:]
+        rec['seq'][slots] = seqs
+        ring.header['seq'] = seq0 + n  # publish
+        return seq0 + n
+
+    def publish_frame(self, symbol, df):
+        # OHLCV frame (fetch_data / resample output) -> bars on the bus
+        index = pd.DatetimeIndex(df.index)
+        index = index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC')
+        times = index.tz_convert(None).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        values = df.reindex(columns=BAR_COLUMNS).to_numpy(dtype=np.float64)
+        if 'Ticks' not in df:
+            values[:, BAR_COLUMNS.index('Ticks')] = 1.0
+        return self.publish_many(symbol, times, values)
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+        self.rings = {}
+
+
+class BusSubscriber:
+    """Reads one symbol's ring; poll() returns the records published since the last poll.
+
+    start='latest' only delivers bars published after the first poll,
+    'oldest' starts with everything still in the ring.
+    """
+
+    def __init__(self, symbol, prefix=BUS_PREFIX, start='latest'):
+        self.symbol = symbol
+        self.prefix = prefix
+        self.start = start
+        self.ring = None
+        self.last = 0          # sequence number of the last record consumed
+        self.lost = 0          # bars skipped over since start
+
+    def _attach(self):
+        if self.ring is None:
+            try:
+                self.ring = Ring.open(self.symbol, self.prefix)
+            except FileNotFoundError:
+                return False
+            seq = self.ring.seq
+            self.last = seq if self.start == 'latest' else max(seq - self.ring.capacity, 0)
+        return True
+
+    def pending(self):
+        return self.ring.seq - self.last if self._attach() else 0
+
+    def poll(self, copy=False):
+        """(records, lost): new records in sequence order and the number of bars lost before them.
+
+        records is a view into shared memory unless the batch wraps around
+        the end of the ring or copy=True; consume it before the publisher
+        gets `capacity` bars further.
+        """
+        if not self._attach():
+            return _EMPTY, 0
+        ring = self.ring
+        head = ring.seq
+        if head < self.last:
+            # Segment was recreated: start over from its beginning
+            self.last = 0
+        n = head - self.last
+        if n <= 0:
+            return _EMPTY, 0
+        lost = max(n - ring.capacity, 0)
+        first = self.last + lost + 1
+        lo = (first - 1) % ring.capacity
+        count = head - first + 1
+        if lo + count <= ring.capacity:
+            records = ring.records[lo:lo + count]
+        else:
+            records = np.concatenate((ring.records[lo:], ring.records[:lo + count - ring.capacity]))
+        # Slots the publisher reused while we were reading
+        ok = records['seq'] == np.arange(first, head + 1)
+        if not ok.all():
+            lost += int((~ok).sum())
+            records = records[ok]
+        self.last = head
+        self.lost += lost
+        return (records.copy() if copy else records), lost
+
+    def wait(self, timeout, spin=SPIN_SECONDS, max_sleep=MAX_SLEEP):
+        # Until a new bar is published or timeout seconds pass; True if there is one
+        return _wait_for(self.pending, timeout, spin, max_sleep)
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+class BusReader:
+    """Drop-in for ingest.TailReader in the live loops, reading bars off the bus."""
+
+    columns = BAR_COLUMNS
+
+    def __init__(self, symbol, prefix=BUS_PREFIX, start='oldest'):
+        self.symbol = symbol
+        self.sub = BusSubscriber(symbol, prefix, start)
+        self.last_ts = None
+
+    def poll(self):
+        # New bars as (timestamp, values view) pairs, like TailReader.poll
+        records, lost = self.sub.poll()
+        if lost:
+            print(f"⚠️ {self.symbol}: {lost} bars lost on the bus")
+        bars = [(pd.Timestamp(int(t), tz='UTC'), v) for t, v in zip(records['time'], records['values'])]
+        if bars:
+            self.last_ts = bars[-1][0]
+        return bars
+
+    def ohlcv(self, values):
+        # BAR_COLUMNS start with the IndicatorEngine.update() arguments
+        return values[:5]
+
+    def wait(self, timeout):
+        return self.sub.wait(timeout)
+
+
+class BusFeed:
+    """One BusReader per symbol; same interface as ingest.BarFeed."""
+
+    def __init__(self, symbols, prefix=BUS_PREFIX, start='oldest'):
+        self.readers = {s: BusReader(s, prefix, start) for s in symbols}
+
+    def poll(self):
+        return {s: r.poll() for s, r in self.readers.items()}
+
+    def wait(self, timeout, spin=SPIN_SECONDS, max_sleep=MAX_SLEEP):
+        # Until any symbol has a new bar
+        return _wait_for(lambda: any(r.sub.pending() for r in self.readers.values()),
+                         timeout, spin, max_sleep)
+
+
+def _segments(prefix=BUS_PREFIX):
+    shm_dir = '/dev/shm'
+    if not os.path.isdir(shm_dir):
+        return []
+    return sorted(n for n in os.listdir(shm_dir) if n.startswith(f"{prefix}_"))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shared-memory market data bus")
+    parser.add_argument('--prefix', default=BUS_PREFIX)
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('status')
+    p_unlink = sub.add_parser('unlink', help="remove the segments of SYMBOLs (all by default)")
+    p_unlink.add_argument('symbols', nargs='*')
+    args = parser.parse_args()
+
+    if args.cmd == 'unlink':
+        names = [segment_name(s, args.prefix) for s in args.symbols] or _segments(args.prefix)
+        for name in names:
+            try:
+                # Tracked attach: unlink() unregisters it again
+                shm = shared_memory.SharedMemory(name)
+                shm.close()
+                shm.unlink()
+                print(f"🗑 {name}")
+            except FileNotFoundError:
+                print(f"⚠️ {name}: no such segment")
+    else:
+        for name in _segments(args.prefix):
+            ring = Ring(_shm(name))
+            seq = ring.seq
+            last = pd.Timestamp(int(ring.records['time'][(seq - 1) % ring.capacity]), tz='UTC') if seq else None
+            print(f"{name}: {seq} bars published, capacity {ring.capacity}, last bar {last}")
+            ring.close()
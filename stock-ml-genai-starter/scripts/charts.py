@@ -0,0 +1,240 @@
+# Cached chart builder for plotly_dashboard.py and plot_advanced.py
+#
+# build() renders one chart per symbol in a process pool. Each worker loads
+# the symbol's features itself (memory-mapped from the store), hashes the
+# window it is about to plot together with the chart settings, and skips the
+# render when the hash matches charts/_manifest.json and the files exist, so
+# a refresh only redraws symbols whose data changed. Long windows are
+# decimated before plotting: candles are merged into at most `points`
+# buckets (first open, max high, min low, last close, summed volume) and
+# indicator lines are reduced with LTTB.
+#
+# Workers draw with matplotlib's Agg backend, and the Kaleido renderer for PNG
+# export is started once per worker on first use and reused for every chart
+# that worker draws. Files are written to a temp name and renamed, so a
+# viewer never picks up a half-written chart.
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from decimate import lttb
+from feature_store import load_features
+
+CHART_FOLDER = 'charts'
+MANIFEST_FILE = '_manifest.json'
+RENDER_VERSION = 1   # bump when the chart code changes, so every chart is redrawn once
+
+_kaleido_started = False
+
+
+def data_hash(df, *params):
+    h = hashlib.sha1(json.dumps([RENDER_VERSION, *params]).encode())
+    h.update(','.join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+# --- Decimation
+def ohlc_buckets(df, n):
+    # At most n candles: consecutive bars merged like a resample, volume summed
+    if len(df) <= n:
+        return df
+    starts = np.unique(np.arange(n) * len(df) // n)
+    ends = np.r_[starts[1:], len(df)] - 1
+    return pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(), starts),
+        'Close': df['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(df['Volume'].to_numpy(), starts),
+    }, index=df.index[starts])
+
+
+def line(series, n):
+    # (x, y) of a series reduced to n points with LTTB
+    series = series.dropna()
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    keep = lttb(x, series.to_numpy(dtype=np.float64), n)
+    return series.index[keep], series.to_numpy()[keep]
+
+
+# --- Charts
+def _start_renderer():
+    # One Kaleido renderer per worker; kaleido>=1 needs an explicit persistent
+    # server, 0.2.x keeps its subprocess alive after the first write_image
+    global _kaleido_started
+    if _kaleido_started:
+        return
+    import kaleido
+    if hasattr(kaleido, 'start_sync_server'):
+        kaleido.start_sync_server(silence_warnings=True)
+    _kaleido_started = True
+
+
+def dashboard_figure(symbol, df, points):
+    # 4 rows: candlestick + SMAs + crosses, volume, MACD, RSI
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=4, cols=1, shared_xaxes=True,
+                        row_heights=[0.5, 0.1, 0.2, 0.2],
+                        vertical_spacing=0.02,
+                        subplot_titles=(f"{symbol} Candlestick + SMA",
+                                        "Volume", "MACD", "RSI"))
+    candles = ohlc_buckets(df, points)
+
+    # --- Candlestick, SMA_20 & SMA_50
+    fig.add_trace(go.Candlestick(x=candles.index,
+                                 open=candles['Open'], high=candles['High'],
+                                 low=candles['Low'], close=candles['Close'],
+                                 name='Candles'), row=1, col=1)
+    for col, color in (('SMA_20', 'blue'), ('SMA_50', 'orange')):
+        x, y = line(df[col], points)
+        fig.add_trace(go.Scatter(x=x, y=y, line=dict(color=color), name=col), row=1, col=1)
+
+    # --- Golden/Death crosses (sparse, never decimated)
+    golden_idx = df.index[df['golden_cross'] == 1]
+    fig.add_trace(go.Scatter(x=golden_idx, y=df.loc[golden_idx, 'Close'],
+                             mode='markers', marker=dict(color='green', size=10, symbol='triangle-up'),
+                             name='Golden Cross'), row=1, col=1)
+    death_idx = df.index[df['death_cross'] == 1]
+    fig.add_trace(go.Scatter(x=death_idx, y=df.loc[death_idx, 'Close'],
+                             mode='markers', marker=dict(color='red', size=10, symbol='triangle-down'),
+                             name='Death Cross'), row=1, col=1)
+
+    # --- Volume
+    fig.add_trace(go.Bar(x=candles.index, y=candles['Volume'], name='Volume',
+                         marker_color='grey', opacity=0.4),
+                  row=2, col=1)
+
+    # --- MACD
+    for col, name, color in (('MACD', 'MACD', 'green'), ('MACD_signal', 'Signal', 'red')):
+        x, y = line(df[col], points)
+        fig.add_trace(go.Scatter(x=x, y=y, name=name, line=dict(color=color)), row=3, col=1)
+    x, y = line(df['MACD_hist'], points)
+    fig.add_trace(go.Bar(x=x, y=y, name='Hist', marker_color='grey', opacity=0.4), row=3, col=1)
+
+    # --- RSI with overbought/oversold lines
+    x, y = line(df['RSI_14'], points)
+    fig.add_trace(go.Scatter(x=x, y=y, name='RSI', line=dict(color='purple')), row=4, col=1)
+    fig.add_hline(y=70, line_dash='dash', line_color='red', row=4, col=1)
+    fig.add_hline(y=30, line_dash='dash', line_color='green', row=4, col=1)
+
+    fig.update_layout(title=f"{symbol} Dashboard",
+                      xaxis_rangeslider_visible=False,
+                      width=1000, height=900, template='plotly_dark',
+                      legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1))
+    return fig
+
+
+def render_dashboard(symbol, df, points, paths):
+    html_path, png_path = paths
+    fig = dashboard_figure(symbol, df, points)
+    # plotly.js is written once next to the charts instead of inlined in every file
+    fig.write_html(f"{html_path}.tmp", include_plotlyjs='directory')
+    os.replace(f"{html_path}.tmp", html_path)
+    _start_renderer()
+    fig.write_image(f"{png_path}.tmp", format='png')
+    os.replace(f"{png_path}.tmp", png_path)
+
+
+def render_candles(symbol, df, points, paths):
+    # mplfinance candlestick with SMA_20/50 and golden/death cross markers
+    import matplotlib
+    matplotlib.use('Agg')   # workers draw off-screen
+    import mplfinance as mpf
+    import matplotlib.pyplot as plt
+
+    candles = ohlc_buckets(df, points)
+    # Indicators at the candle timestamps (exact when nothing was merged)
+    ind = df.reindex(candles.index) if len(candles) < len(df) else df
+    apds = [
+        mpf.make_addplot(ind['SMA_20'], color='blue'),
+        mpf.make_addplot(ind['SMA_50'], color='orange'),
+    ]
+    # Crosses as scatter addplots: NaN except at the bucket a cross falls in
+    bucket = np.searchsorted(candles.index.asi8, df.index.asi8, side='right') - 1
+    for col, marker, color in (('golden_cross', '^', 'green'), ('death_cross', 'v', 'red')):
+        hits = bucket[df[col].to_numpy() == 1]
+        if len(hits):
+            marks = np.full(len(candles), np.nan)
+            marks[hits] = candles['Close'].to_numpy()[hits]
+            apds.append(mpf.make_addplot(marks, type='scatter', marker=marker, color=color, markersize=100))
+
+    fig, _ = mpf.plot(candles, type='candle', style='yahoo',
+                      addplot=apds, volume=True, returnfig=True,
+                      title=f"{symbol} - Candlestick with SMA & Crosses",
+                      figsize=(12, 6))
+    fig.savefig(f"{paths[0]}.tmp", format='png')
+    plt.close(fig)
+    os.replace(f"{paths[0]}.tmp", paths[0])
+
+
+CHARTS = {
+    # kind -> (renderer, output file names)
+    'dashboard': (render_dashboard, lambda s: [f"{s}_dashboard.html", f"{s}_dashboard.png"]),
+    'candles': (render_candles, lambda s: [f"{s}_candles.png"]),
+}
+
+
+# --- Worker pool
+def render(kind, symbol, bars, points, folder, old_hash=None, force=False):
+    # Runs in a worker; returns (symbol, hash, status, seconds)
+    t0 = time.perf_counter()
+    renderer, names = CHARTS[kind]
+    df = load_features(symbol)
+    if bars:
+        df = df.iloc[-bars:]
+    digest = data_hash(df, kind, bars, points)
+    paths = [os.path.join(folder, name) for name in names(symbol)]
+    if not force and digest == old_hash and all(os.path.exists(p) for p in paths):
+        return symbol, digest, 'unchanged', time.perf_counter() - t0
+    renderer(symbol, df, points, paths)
+    return symbol, digest, 'rendered', time.perf_counter() - t0
+
+
+def _read_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(folder, manifest):
+    path = os.path.join(folder, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def build(kind, symbols, bars=200, points=1000, workers=None, folder=CHART_FOLDER, force=False):
+    # Render `kind` charts for all symbols; returns {symbol: status}
+    os.makedirs(folder, exist_ok=True)
+    manifest = _read_manifest(folder)
+    workers = min(workers or os.cpu_count() or 1, len(symbols))
+    status = {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render, kind, s, bars, points, folder, manifest.get(f"{kind}/{s}"), force): s
+                   for s in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                _, digest, status[symbol], seconds = future.result()
+                manifest[f"{kind}/{symbol}"] = digest
+                print(f"  {symbol}: {status[symbol]} ({seconds:.2f}s)")
+            except Exception as e:
+                # Keep the old hash: the chart is retried on the next build
+                status[symbol] = 'failed'
+                print(f"⚠️ {symbol}: {e}")
+    _write_manifest(folder, manifest)
+    rendered = sum(v == 'rendered' for v in status.values())
+    print(f"✅ {kind}: {rendered} rendered, {len(symbols) - rendered} skipped/failed "
+          f"in {time.perf_counter() - t0:.2f}s ({workers} workers) -> {folder}/")
+    return status
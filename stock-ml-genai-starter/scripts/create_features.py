@@ -1,66 +1,102 @@
 import os
+import pickle
+import argparse
 import pandas as pd
 
+from indicators import IndicatorEngine, PanelEngine, panel_features
+from feature_store import FeatureStore, read_raw_csv
+
 symbols = ['AAPL', 'AMZN', 'GOOGL', 'MSFT', 'SPY', 'EURUSD=X', 'GBPUSD=X']
 
+parser = argparse.ArgumentParser(description="Compute indicator features for every symbol")
+# --rebuild ignores saved engine state and recomputes from the full history
+parser.add_argument('--rebuild', action='store_true')
+# --panel computes all symbols together on a shared time grid (always a full rebuild,
+# same rows and values as --rebuild)
+parser.add_argument('--panel', action='store_true')
+parser.add_argument('--chunk-rows', type=int, default=None, help="panel mode: grid rows per chunk")
+# --timeframe reads data/{symbol}_{timeframe}.csv (see resample.py); features of
+# other timeframes than 1min are stored under the name {symbol}_{timeframe}
+parser.add_argument('--timeframe', default='1min')
+args = parser.parse_args()
+
 # Make sure 'data' folder exists
 os.makedirs('data', exist_ok=True)
 
-for symbol in symbols:
-    print(f"\n=== Processing {symbol} ===")
+# Features also go to the binary store, which the other scripts read first
+store = FeatureStore()
+
+
+def feature_name(symbol):
+    return symbol if args.timeframe == '1min' else f"{symbol}_{args.timeframe}"
+
 
+def load_bars(symbol):
     # Load CSV; parse dates; index = first column
-    df = pd.read_csv(f"data/{symbol}_1min.csv", index_col=0, parse_dates=True)
+    df = pd.read_csv(f"data/{symbol}_{args.timeframe}.csv", index_col=0, parse_dates=True)
 
     # Convert price/volume columns to numeric (fix strings issue)
     for col in ['Close', 'Open', 'High', 'Low', 'Volume']:
         df[col] = pd.to_numeric(df[col], errors='coerce')
 
     # Drop rows where Close is NaN (in case parsing failed)
-    df.dropna(subset=['Close'], inplace=True)
-
-    # Returns
-    df['returns'] = df['Close'].pct_change(fill_method=None)
-
-    # Simple Moving Averages
-    df['SMA_5'] = df['Close'].rolling(window=5).mean()
-    df['SMA_10'] = df['Close'].rolling(window=10).mean()
-    df['SMA_20'] = df['Close'].rolling(window=20).mean()
-    df['SMA_50'] = df['Close'].rolling(window=50).mean()
-
-    # RSI (14)
-    delta = df['Close'].diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=14).mean()
-    avg_loss = loss.rolling(window=14).mean()
-    rs = avg_gain / avg_loss
-    df['RSI_14'] = 100 - (100 / (1 + rs))
-
-    # Golden Cross / Death Cross
-    df['golden_cross'] = ((df['SMA_20'] > df['SMA_50']) & (df['SMA_20'].shift(1) <= df['SMA_50'].shift(1))).astype(int)
-    df['death_cross'] = ((df['SMA_20'] < df['SMA_50']) & (df['SMA_20'].shift(1) >= df['SMA_50'].shift(1))).astype(int)
-
-    # MACD
-    ema_12 = df['Close'].ewm(span=12, adjust=False).mean()
-    ema_26 = df['Close'].ewm(span=26, adjust=False).mean()
-    df['MACD'] = ema_12 - ema_26
-    df['MACD_signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-    df['MACD_hist'] = df['MACD'] - df['MACD_signal']
-
-    # Bollinger Bands (using SMA_20 and std)
-    std = df['Close'].rolling(window=20).std()
-    df['bollinger_mid'] = df['SMA_20']
-    df['bollinger_upper'] = df['SMA_20'] + 2 * std
-    df['bollinger_lower'] = df['SMA_20'] - 2 * std
-    df['bollinger_bandwidth'] = df['bollinger_upper'] - df['bollinger_lower']
-
-    # Drop initial NaNs from rolling windows
-    df.dropna(inplace=True)
-
-    print(df.head())
-
-    # Save new feature file
-    out_file = f"data/{symbol}_features.csv"
-    df.to_csv(out_file)
-    print(f"✅ Saved features to {out_file}")
+    return df.dropna(subset=['Close'])
+
+
+if args.panel:
+    # One (time x symbol) pass per chunk instead of one pipeline per symbol.
+    # Each symbol's windows only see its own bars, so the result is what the
+    # per-symbol engines produce, and their state is saved for the next
+    # incremental run.
+    print(f"\n=== Processing {len(symbols)} symbols as a panel ===")
+    # Timestamps must be comparable across symbols: parse them all to UTC
+    frames = {feature_name(symbol): read_raw_csv(f"data/{symbol}_{args.timeframe}.csv").dropna(subset=['Close'])
+              for symbol in symbols}
+    written = dict.fromkeys(frames, 0)
+    panel = PanelEngine(len(frames))
+    for chunk in panel_features(frames, args.chunk_rows, panel):
+        for symbol, features in chunk.items():
+            first = written[symbol] == 0
+            if features.empty and not first:
+                continue
+            features.to_csv(f"data/{symbol}_features.csv", mode='w' if first else 'a', header=first)
+            store.write('features', symbol, features, append=not first)
+            written[symbol] += len(features)
+    for j, symbol in enumerate(symbols):
+        name = feature_name(symbol)
+        # Engine state from the bars as the incremental path reads them
+        with open(f"data/{name}_features.state", 'wb') as f:
+            pickle.dump(panel.symbol_engine(j, load_bars(symbol)), f)
+        print(f"✅ {name}: saved {written[name]} rows to data/{name}_features.csv")
+else:
+    for symbol in symbols:
+        print(f"\n=== Processing {symbol} ===")
+        df = load_bars(symbol)
+
+        name = feature_name(symbol)
+        out_file = f"data/{name}_features.csv"
+        state_file = f"data/{name}_features.state"
+
+        # Resume the indicator engine where the last run stopped and only feed
+        # it the bars that arrived since; otherwise seed it from the full history.
+        if not args.rebuild and os.path.exists(state_file) and os.path.exists(out_file):
+            with open(state_file, 'rb') as f:
+                engine = pickle.load(f)
+            new_bars = df[df.index > engine.last_ts]
+            if new_bars.empty:
+                print(f"✅ {out_file} already up to date")
+                continue
+            features = engine.seed(new_bars)
+            features.to_csv(out_file, mode='a', header=False)
+            store.write('features', name, features, append=True)
+            print(f"✅ Appended {len(features)} rows to {out_file}")
+        else:
+            engine = IndicatorEngine()
+            features = engine.seed(df)
+            print(features.head())
+            features.to_csv(out_file)
+            store.write('features', name, features)
+            print(f"✅ Saved features to {out_file}")
+
+        with open(state_file, 'wb') as f:
+            pickle.dump(engine, f)
@@ -1,52 +1,55 @@
-import os
-import pandas as pd
 import streamlit as st
-from glob import glob
+
+from trade_log import TradeLogReader
+from latency import read_latency
 
 # --- Config ---
 LOG_FOLDER = "trade_logs"
+CHART_POINTS = 800   # ~chart width in pixels; the PnL series is downsampled to this
 st.set_page_config(page_title="📊 Live Trading Dashboard", layout="wide")
 
 st.title("📊 Live Trading Dashboard")
 
-# --- Load all trade logs
-log_files = sorted(glob(f"{LOG_FOLDER}/*.txt"))
-df_list = []
-
-for file in log_files:
-    try:
-        df = pd.read_csv(file, names=["time", "symbol", "price", "action", "qty", "stop_price", "pnl"])
-        df["time"] = pd.to_datetime(df["time"])
-        df_list.append(df)
-    except Exception as e:
-        st.warning(f"Failed to load {file}: {e}")
-
-if df_list:
-    df_all = pd.concat(df_list).sort_values("time")
-else:
+
+# --- Trade logs: one reader per server process, each refresh only parses appended lines
+@st.cache_resource
+def get_log_reader():
+    return TradeLogReader(LOG_FOLDER, width=CHART_POINTS)
+
+
+reader = get_log_reader()
+try:
+    reader.refresh()
+except Exception as e:
+    st.warning(f"Failed to load trade logs: {e}")
+
+if reader.count == 0:
     st.warning("No trade logs found yet.")
     st.stop()
 
 # --- Show latest trades
 st.subheader("Recent Trades")
-st.dataframe(df_all.tail(10), use_container_width=True)
-
-# --- Compute cumulative PnL
-df_all["cum_pnl"] = df_all["pnl"].cumsum()
+st.dataframe(reader.recent, use_container_width=True)
 
 col1, col2 = st.columns(2)
 
 with col1:
-    st.metric("📈 Total Trades", len(df_all))
-    st.metric("💰 Current Unrealized PnL", f"${df_all['pnl'].iloc[-1]:.2f}")
+    st.metric("📈 Total Trades", reader.count)
+    st.metric("💰 Current Unrealized PnL", f"${reader.last_pnl:.2f}")
 
 with col2:
-    # PnL chart
+    # PnL chart (running cumulative PnL, downsampled to the chart width)
     st.subheader("📊 Cumulative PnL")
-    st.line_chart(df_all.set_index("time")["cum_pnl"])
+    st.line_chart(reader.cum_pnl_series())
+
+# --- Loop latency (exported every few seconds by the live loops)
+latency = read_latency(LOG_FOLDER)
+if not latency.empty:
+    st.subheader("⏱ Latency (ms, last 1000 calls per stage)")
+    cols = ['loop', 'stage', 'symbol', 'count', 'errors', 'last_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'updated']
+    st.dataframe(latency[cols].round(3), use_container_width=True)
 
-# --- Auto-refresh every 10 seconds
+# --- Auto-refresh every 5 seconds
 from streamlit_autorefresh import st_autorefresh
 
-# Auto-refresh every 5 seconds
 count = st_autorefresh(interval=5000, key="refresh")
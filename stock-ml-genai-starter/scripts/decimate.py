@@ -0,0 +1,105 @@
+# Downsampling of long series before they are handed to a chart
+#
+# M4Downsampler keeps, per time bucket, the first, min, max and last point
+# (M4 aggregation: a line drawn through them is pixel-identical to the full
+# series at that width). Points are added incrementally; when the number of
+# buckets exceeds `width` the bucket size doubles and neighbouring buckets are
+# merged, so memory and per-refresh cost stay O(width) however long it runs.
+#
+# lttb() is the one-shot version for a whole series (the static charts): it
+# picks n points with Largest-Triangle-Three-Buckets, which keeps the visual
+# shape (peaks, troughs, slope changes) with one point per bucket.
+import numpy as np
+
+_FIELDS = ('id', 'ft', 'fv', 'nt', 'nv', 'xt', 'xv', 'lt', 'lv')
+
+
+def _merge(b):
+    # Combine consecutive buckets sharing an id (ids are sorted)
+    ids = b['id']
+    if len(ids) < 2:
+        return b
+    change = np.r_[True, ids[1:] != ids[:-1]]
+    if change.all():
+        return b
+    starts = np.flatnonzero(change)
+    ends = np.r_[starts[1:], len(ids)] - 1
+    group = np.cumsum(change) - 1
+    # lexsort by (group, value): the first row of each group is its min / max
+    min_idx = np.lexsort((b['nv'], group))[starts]
+    max_idx = np.lexsort((-b['xv'], group))[starts]
+    return {
+        'id': ids[starts],
+        'ft': b['ft'][starts], 'fv': b['fv'][starts],
+        'nt': b['nt'][min_idx], 'nv': b['nv'][min_idx],
+        'xt': b['xt'][max_idx], 'xv': b['xv'][max_idx],
+        'lt': b['lt'][ends], 'lv': b['lv'][ends],
+    }
+
+
+class M4Downsampler:
+    def __init__(self, width=800, bucket=1.0):
+        self.width = width
+        self.bucket = bucket   # bucket size in the units of t (seconds for the dashboards)
+        self.b = {f: np.empty(0, dtype=np.int64 if f == 'id' else np.float64) for f in _FIELDS}
+
+    def __len__(self):
+        return len(self.b['id'])
+
+    def add_many(self, t, v):
+        t = np.asarray(t, dtype=np.float64)
+        v = np.asarray(v, dtype=np.float64)
+        keep = ~(np.isnan(t) | np.isnan(v))
+        t, v = t[keep], v[keep]
+        if not len(t):
+            return
+        ids = np.floor(t / self.bucket).astype(np.int64)
+        # Late points are folded into the latest bucket instead of reordering history
+        floor_id = self.b['id'][-1] if len(self) else ids[0]
+        ids = np.maximum.accumulate(np.maximum(ids, floor_id))
+        new = {'id': ids, 'ft': t, 'fv': v, 'nt': t, 'nv': v, 'xt': t, 'xv': v, 'lt': t, 'lv': v}
+        self.b = _merge({f: np.concatenate((self.b[f], new[f])) for f in _FIELDS})
+        while len(self) > self.width:
+            self.bucket *= 2
+            self.b['id'] = self.b['id'] // 2
+            self.b = _merge(self.b)
+
+    def points(self):
+        # Up to 4 points per bucket, in time order, without repeats
+        n = len(self)
+        if not n:
+            return np.empty(0), np.empty(0)
+        t = np.stack([self.b['ft'], self.b['nt'], self.b['xt'], self.b['lt']], axis=1)
+        v = np.stack([self.b['fv'], self.b['nv'], self.b['xv'], self.b['lv']], axis=1)
+        order = np.argsort(t, axis=1, kind='stable')
+        t = np.take_along_axis(t, order, axis=1).ravel()
+        v = np.take_along_axis(v, order, axis=1).ravel()
+        keep = np.r_[True, (t[1:] != t[:-1]) | (v[1:] != v[:-1])]
+        return t[keep], v[keep]
+
+
+def lttb(x, y, n):
+    """Indices of the n points Largest-Triangle-Three-Buckets keeps (x increasing, no NaNs).
+
+    The first and last points are always kept; the rest is split into n - 2
+    buckets and each bucket keeps the point forming the largest triangle with
+    the point kept before it and the mean of the next bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    # Bucket i covers [edges[i], edges[i + 1]); the last edge is the final point
+    edges = (np.arange(n - 1) * (size - 2) // (n - 2) + 1).astype(np.int64)
+    edges = np.r_[edges, size]
+    idx = np.empty(n, dtype=np.int64)
+    idx[0], idx[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi, next_hi = edges[i], edges[i + 1], edges[i + 2]
+        cx, cy = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
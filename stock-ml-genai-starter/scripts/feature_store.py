@@ -0,0 +1,293 @@
+# Columnar binary store for bars and features
+#
+# Layout: store/{dataset}/{symbol}/{YYYY-MM-DD}/v{n}/{column}.npy plus
+# _index.npy (int64 ns timestamps), a per-day _current file naming the live
+# version and a per-symbol _schema.json. Float columns are kept as float32,
+# integer columns as int64. Partitions are plain .npy files, so reads are
+# memory-mapped and only the requested columns and days are touched.
+#
+# A rewrite of a day goes to a new version directory and then swaps the
+# _current pointer with os.replace, so readers see the old day or the new one
+# and never a missing or half-written day. Day directories written before
+# versioning (files directly in the day directory) are still read.
+#
+# Usage: python scripts/feature_store.py   (imports the existing data/*.csv files)
+import os
+import re
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+
+STORE_ROOT = 'store'
+INDEX_FILE = '_index.npy'
+SCHEMA_FILE = '_schema.json'
+CURRENT_FILE = '_current'
+DAY_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+VERSION_RE = re.compile(r'v\d+')
+
+
+def read_raw_csv(path):
+    # yfinance CSVs carry Price/Ticker/Datetime header rows; coerce them away
+    df = pd.read_csv(path, index_col=0, float_precision='round_trip')
+    index = pd.to_datetime(df.index, format='ISO8601', errors='coerce', utc=True)
+    df = df[index.notna()]
+    df.index = index[index.notna()]
+    df.index.name = 'Datetime'
+    try:
+        # astype parses strings exactly like float(), unlike to_numeric's fast path
+        df = df.astype(np.float64)
+    except ValueError:
+        df = df.apply(pd.to_numeric, errors='coerce')
+    return df.dropna(subset=['Close'])
+
+
+class FeatureStore:
+    def __init__(self, root=STORE_ROOT, float_dtype=np.float32):
+        self.root = root
+        self.float_dtype = np.dtype(float_dtype)
+
+    def _symbol_dir(self, dataset, symbol):
+        return os.path.join(self.root, dataset, symbol)
+
+    def has(self, dataset, symbol):
+        return os.path.exists(os.path.join(self._symbol_dir(dataset, symbol), SCHEMA_FILE))
+
+    def symbols(self, dataset):
+        path = os.path.join(self.root, dataset)
+        if not os.path.isdir(path):
+            return []
+        return sorted(s for s in os.listdir(path) if self.has(dataset, s))
+
+    def schema(self, dataset, symbol):
+        with open(os.path.join(self._symbol_dir(dataset, symbol), SCHEMA_FILE)) as f:
+            return json.load(f)
+
+    def partitions(self, dataset, symbol):
+        # Day names only: leftover DAY.tmp / DAY.old directories are never listed
+        sym_dir = self._symbol_dir(dataset, symbol)
+        return sorted(p for p in os.listdir(sym_dir)
+                      if DAY_RE.fullmatch(p) and (os.path.exists(os.path.join(sym_dir, p, CURRENT_FILE))
+                                                  or os.path.exists(os.path.join(sym_dir, p, INDEX_FILE))))
+
+    def _live_dir(self, day_dir):
+        # Directory holding a day's files: the version its pointer names, or the
+        # day directory itself for partitions written before versioning
+        try:
+            with open(os.path.join(day_dir, CURRENT_FILE)) as f:
+                return os.path.join(day_dir, f.read().strip())
+        except FileNotFoundError:
+            return day_dir
+
+    def partition_dir(self, dataset, symbol, day):
+        return self._live_dir(os.path.join(self._symbol_dir(dataset, symbol), day))
+
+    # --- Write
+    def _column_dtype(self, series):
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+            return np.dtype(np.int64)
+        return self.float_dtype
+
+    def write(self, dataset, symbol, df, append=False):
+        # Overwrite (default) or merge df into the symbol's day partitions
+        df = df.sort_index()
+        index = pd.DatetimeIndex(df.index)
+        df = df.set_axis(index)   # string indexes (CSV reads) must merge with the stored timestamps
+        tz = str(index.tz) if index.tz is not None else None
+        sym_dir = self._symbol_dir(dataset, symbol)
+
+        os.makedirs(sym_dir, exist_ok=True)
+        self._clean(sym_dir)
+
+        schema = {'columns': {c: self._column_dtype(df[c]).str for c in df.columns}, 'tz': tz}
+        if append and self.has(dataset, symbol):
+            old = self.schema(dataset, symbol)
+            if list(old['columns']) != list(schema['columns']):
+                raise ValueError(f"{dataset}/{symbol}: columns differ from stored schema")
+            schema = old
+
+        stored = set(self.partitions(dataset, symbol))
+        days = (index.tz_convert('UTC') if tz else index).strftime('%Y-%m-%d')
+        for day in pd.unique(days):
+            part = df[days == day]
+            if append and day in stored:
+                existing = self._read_partition(sym_dir, day, schema, list(schema['columns']), mmap=False)
+                part = pd.concat([existing, part])
+                part = part[~part.index.duplicated(keep='last')].sort_index()
+            self._write_partition(os.path.join(sym_dir, day), part, schema)
+
+        self._write_json(os.path.join(sym_dir, SCHEMA_FILE), schema)
+        if not append:
+            # An overwrite replaces days in place; days it doesn't cover go last
+            for day in stored.difference(days):
+                shutil.rmtree(os.path.join(sym_dir, day))
+
+    def _write_json(self, path, obj):
+        with open(path + '.tmp', 'w') as f:
+            json.dump(obj, f)
+        os.replace(path + '.tmp', path)
+
+    def _write_partition(self, day_dir, part, schema):
+        # Write a new version of the day, then point _current at it
+        version = f"v{time.time_ns()}"
+        ver_dir = os.path.join(day_dir, version)
+        os.makedirs(ver_dir)
+        index = pd.DatetimeIndex(part.index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        np.save(os.path.join(ver_dir, INDEX_FILE), index.as_unit('ns').asi8)
+        for col, dtype in schema['columns'].items():
+            np.save(os.path.join(ver_dir, f"{col}.npy"), part[col].to_numpy().astype(dtype))
+        pointer = os.path.join(day_dir, CURRENT_FILE)
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(pointer + '.tmp', pointer)
+        # Older versions, and the files of an unversioned day, are unreachable now
+        for name in os.listdir(day_dir):
+            path = os.path.join(day_dir, name)
+            if VERSION_RE.fullmatch(name) and name != version:
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.endswith('.npy'):
+                os.remove(path)
+
+    def _clean(self, sym_dir):
+        # Leftovers of interrupted writes: DAY.tmp / DAY.old directories from the
+        # unversioned writer and versions no pointer names. Only writers clean,
+        # so a reader never removes a version that is still being written.
+        for name in os.listdir(sym_dir):
+            path = os.path.join(sym_dir, name)
+            if name.endswith(('.tmp', '.old')) and DAY_RE.fullmatch(name[:-4]):
+                shutil.rmtree(path, ignore_errors=True)
+            elif DAY_RE.fullmatch(name) and os.path.exists(os.path.join(path, CURRENT_FILE)):
+                live = os.path.basename(self._live_dir(path))
+                for version in os.listdir(path):
+                    if VERSION_RE.fullmatch(version) and version != live:
+                        shutil.rmtree(os.path.join(path, version), ignore_errors=True)
+
+    # --- Read
+    def _read_partition(self, sym_dir, day, schema, columns, start_ns=None, end_ns=None, mmap=True):
+        try:
+            return self._load_partition(self._live_dir(os.path.join(sym_dir, day)), schema, columns,
+                                        start_ns, end_ns, mmap)
+        except FileNotFoundError:
+            # The version was replaced (and removed) between reading the pointer and its files
+            return self._load_partition(self._live_dir(os.path.join(sym_dir, day)), schema, columns,
+                                        start_ns, end_ns, mmap)
+
+    def _load_partition(self, part_dir, schema, columns, start_ns, end_ns, mmap):
+        mode = 'r' if mmap else None
+        index = np.load(os.path.join(part_dir, INDEX_FILE), mmap_mode=mode)
+        lo = 0 if start_ns is None else int(np.searchsorted(index, start_ns, side='left'))
+        hi = len(index) if end_ns is None else int(np.searchsorted(index, end_ns, side='right'))
+        data = {c: np.load(os.path.join(part_dir, f"{c}.npy"), mmap_mode=mode)[lo:hi] for c in columns}
+        idx = pd.DatetimeIndex(np.asarray(index[lo:hi]).view('datetime64[ns]'), name='Datetime')
+        if schema['tz']:
+            idx = idx.tz_localize('UTC').tz_convert(schema['tz'])
+        return pd.DataFrame(data, index=idx, columns=columns)
+
+    def _to_ns(self, ts, schema):
+        if ts is None:
+            return None
+        ts = pd.Timestamp(ts)
+        if ts.tzinfo is None and schema['tz']:
+            ts = ts.tz_localize(schema['tz'])
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert('UTC').tz_localize(None)
+        return ts.value
+
+    def read(self, dataset, symbol, columns=None, start=None, end=None, mmap=True):
+        # Only the partitions overlapping [start, end] and the requested columns are loaded
+        schema = self.schema(dataset, symbol)
+        columns = list(schema['columns']) if columns is None else list(columns)
+        missing = set(columns) - set(schema['columns'])
+        if missing:
+            raise KeyError(f"{dataset}/{symbol}: unknown columns {sorted(missing)}")
+        start_ns, end_ns = self._to_ns(start, schema), self._to_ns(end, schema)
+        first_day = None if start_ns is None else pd.Timestamp(start_ns).strftime('%Y-%m-%d')
+        last_day = None if end_ns is None else pd.Timestamp(end_ns).strftime('%Y-%m-%d')
+
+        sym_dir = self._symbol_dir(dataset, symbol)
+        parts = [self._read_partition(sym_dir, day, schema, columns, start_ns, end_ns, mmap)
+                 for day in self.partitions(dataset, symbol)
+                 if (first_day is None or day >= first_day) and (last_day is None or day <= last_day)]
+        if not parts:
+            return self._empty(schema, columns)
+        return pd.concat(parts) if len(parts) > 1 else parts[0].copy()
+
+    def _empty(self, schema, columns):
+        index = pd.DatetimeIndex([], name='Datetime')
+        if schema['tz']:
+            index = index.tz_localize(schema['tz'])
+        return pd.DataFrame({c: np.empty(0, dtype=schema['columns'][c]) for c in columns}, index=index)
+
+    def count(self, dataset, symbol):
+        # Row count from the partition indexes alone (memory-mapped, no data read)
+        sym_dir = self._symbol_dir(dataset, symbol)
+        return sum(len(np.load(os.path.join(self._live_dir(os.path.join(sym_dir, day)), INDEX_FILE), mmap_mode='r'))
+                   for day in self.partitions(dataset, symbol))
+
+    def iter_partitions(self, dataset, symbol, columns=None):
+        # One day at a time, oldest first, so a full pass never holds more than a day
+        schema = self.schema(dataset, symbol)
+        columns = list(schema['columns']) if columns is None else list(columns)
+        sym_dir = self._symbol_dir(dataset, symbol)
+        for day in self.partitions(dataset, symbol):
+            yield self._read_partition(sym_dir, day, schema, columns)
+
+    def tail(self, dataset, symbol, n, columns=None):
+        # Last n rows, reading partitions newest-first until there are enough
+        schema = self.schema(dataset, symbol)
+        columns = list(schema['columns']) if columns is None else list(columns)
+        sym_dir = self._symbol_dir(dataset, symbol)
+        parts, rows = [], 0
+        for day in reversed(self.partitions(dataset, symbol)):
+            part = self._read_partition(sym_dir, day, schema, columns)
+            parts.append(part)
+            rows += len(part)
+            if rows >= n:
+                break
+        if not parts:
+            return self._empty(schema, columns)
+        return pd.concat(parts[::-1]).iloc[-n:]
+
+    def last_timestamp(self, dataset, symbol):
+        if not self.has(dataset, symbol):
+            return None
+        tail = self.tail(dataset, symbol, 1, columns=[])
+        return tail.index[-1] if len(tail) else None
+
+
+def load_latest(symbol, n=1, columns=None, root=STORE_ROOT, data_folder='data'):
+    # Last n feature rows without loading the whole history
+    store = FeatureStore(root)
+    if store.has('features', symbol):
+        return store.tail('features', symbol, n, columns)
+    df = pd.read_csv(os.path.join(data_folder, f"{symbol}_features.csv"), index_col=0, parse_dates=True)
+    df = df.iloc[-n:]
+    return df if columns is None else df[list(columns)]
+
+
+def load_features(symbol, columns=None, start=None, end=None, root=STORE_ROOT, data_folder='data'):
+    # Prefer the binary store, fall back to the features CSV
+    store = FeatureStore(root)
+    if store.has('features', symbol):
+        return store.read('features', symbol, columns, start, end)
+    df = pd.read_csv(os.path.join(data_folder, f"{symbol}_features.csv"), index_col=0, parse_dates=True)
+    if start is not None or end is not None:
+        df = df.loc[start:end]
+    return df if columns is None else df[list(columns)]
+
+
+if __name__ == '__main__':
+    symbols = ['AAPL', 'AMZN', 'GOOGL', 'MSFT', 'SPY', 'EURUSD=X', 'GBPUSD=X']
+    store = FeatureStore()
+    for symbol in symbols:
+        raw_file, feat_file = f"data/{symbol}_1min.csv", f"data/{symbol}_features.csv"
+        if os.path.exists(raw_file):
+            store.write('bars', symbol, read_raw_csv(raw_file))
+        if os.path.exists(feat_file):
+            df = pd.read_csv(feat_file, index_col=0)
+            df.index = pd.to_datetime(df.index, utc=True)
+            store.write('features', symbol, df)
+        print(f"✅ {symbol} imported into {STORE_ROOT}/")
@@ -1,16 +1,199 @@
-# Load CSV, compute mid price, save clean data
+# Fetch 1-minute bars for all symbols and merge them into data/{symbol}_1min.csv
+#
+# Symbols are fetched concurrently. For each one only bars newer than the last
+# cached bar are requested (the cache tail is read from the end of the file,
+# not parsed in full); new bars are appended. When the source revised bars we
+# already had (yfinance's newest bar is still forming, so this is the common
+# case) the file is truncated at the first revised bar and the rest is
+# appended again, instead of rewriting the history. Failed requests are retried
+# with exponential backoff. With --bus the new bars are also published to the
+# shared-memory market data bus (bus.py) for the live loops.
+#
+# Usage: python scripts/fetch_data.py [--source yfinance|file] [--source-dir DIR] [--workers N] [--bus]
 import os
-import yfinance as yf
+import abc
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Make sure 'data' folder exists
-os.makedirs('data', exist_ok=True)
+import numpy as np
+import pandas as pd
+
+from ingest import TailReader
+from feature_store import read_raw_csv
 
 symbols = ['AAPL', 'SPY', 'MSFT', 'GOOGL', 'AMZN', 'EURUSD=X', 'GBPUSD=X']
+DATA_FOLDER = 'data'
+COLUMNS = ['Close', 'High', 'Low', 'Open', 'Volume']
+OVERLAP_BARS = 5          # cached bars re-checked for revisions on each refresh
+TAIL_BYTES = 64 * 1024    # searched from the end of the file for the first revised bar
+RETRIES = 4
+BACKOFF_SECONDS = 1.0
+MAX_LOOKBACK = pd.Timedelta(days=7)   # yfinance only serves ~7 days of 1m bars
+
+
+# --- Data sources: fetch(symbol, start) -> DataFrame indexed by UTC timestamps
+class DataSource(abc.ABC):
+    @abc.abstractmethod
+    def fetch(self, symbol, start=None):
+        ...
+
+
+class YFinanceSource(DataSource):
+    def fetch(self, symbol, start=None):
+        import yfinance as yf
+        if start is None:
+            df = yf.download(tickers=symbol, interval='1m', period='1d', progress=False)
+        else:
+            start = max(start, pd.Timestamp.now(tz='UTC') - MAX_LOOKBACK)
+            df = yf.download(tickers=symbol, interval='1m', start=start, progress=False)
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        return df
+
+
+class FileSource(DataSource):
+    # Offline stand-in: serves bars from another folder of {symbol}_1min.csv files
+    def __init__(self, folder):
+        self.folder = folder
+
+    def fetch(self, symbol, start=None):
+        df = read_raw_csv(os.path.join(self.folder, f"{symbol}_1min.csv"))
+        return df if start is None else df[df.index >= start]
+
+
+def fetch_with_retry(source, symbol, start):
+    for attempt in range(RETRIES):
+        try:
+            return source.fetch(symbol, start)
+        except Exception as e:
+            if attempt == RETRIES - 1:
+                raise
+            delay = BACKOFF_SECONDS * 2 ** attempt * (1 + random.random())
+            print(f"⚠️ {symbol}: {e} (retry {attempt + 1}/{RETRIES - 1} in {delay:.1f}s)")
+            time.sleep(delay)
+
+
+def to_utc(index):
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+
+
+def normalize(df):
+    df = df[COLUMNS].copy()
+    df.index = to_utc(df.index)
+    df.index.name = 'Datetime'
+    df = df.apply(pd.to_numeric, errors='coerce').dropna(subset=['Close'])
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+def _line_offset(path, ts):
+    # Byte offset of the line holding bar ts near the end of the file, None if not found
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        start = max(0, size - TAIL_BYTES)
+        f.seek(start)
+        data = f.read()
+    lines = data.split(b'\n')
+    pos = 0
+    if start > 0:
+        pos = len(lines[0]) + 1       # first line is probably cut in half
+        lines = lines[1:]
+    offsets = []
+    for line in lines:
+        offsets.append(pos)
+        pos += len(line) + 1
+    for line, offset in zip(reversed(lines), reversed(offsets)):   # the bar is one of the last few
+        try:
+            if to_utc([pd.Timestamp(line.split(b',', 1)[0].decode('utf-8'))])[0] == ts:
+                return start + offset
+        except ValueError:
+            pass                      # header and yfinance's Ticker/Datetime rows
+    return None
+
+
+def update_symbol(source, symbol, bus=None):
+    path = os.path.join(DATA_FOLDER, f"{symbol}_1min.csv")
+
+    # Last few cached bars, read from the end of the file
+    cached = None
+    if os.path.exists(path):
+        reader = TailReader(path, window=OVERLAP_BARS)
+        reader.poll()
+        if reader.window:
+            cached = reader.frame()
+            cached.index = to_utc(cached.index)
+
+    start = None if cached is None else cached.index[0]
+    fetched = normalize(fetch_with_retry(source, symbol, start))
+    if cached is None:
+        fetched.to_csv(path)
+        if bus is not None:
+            bus.publish_frame(symbol, fetched)
+        return len(fetched), 'created'
+
+    overlap = fetched[fetched.index <= cached.index[-1]]
+    new = fetched[fetched.index > cached.index[-1]]
+    if bus is not None and not new.empty:
+        # Revisions of bars already published stay in the CSV only
+        bus.publish_frame(symbol, new)
+    common = overlap.index.intersection(cached.index)
+    a = overlap.loc[common, cached.columns].to_numpy(dtype=float)
+    b = cached.loc[common].to_numpy(dtype=float)
+    changed = ((a != b) & ~(np.isnan(a) & np.isnan(b))).any(axis=1)
+
+    if changed.any():
+        # The source changed bars we already stored: cut the file at the first
+        # of them and append the merged bars from there
+        first = common[changed.argmax()]
+        offset = _line_offset(path, first)
+        if offset is not None:
+            tail = pd.concat([cached[cached.index >= first], fetched[fetched.index >= first]])
+            tail = tail[~tail.index.duplicated(keep='last')].sort_index()
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+            tail[cached.columns].to_csv(path, mode='a', header=False)
+            return len(new), 'revised'
+        # Not found near the end of the file: merge and rewrite once
+        history = read_raw_csv(path)
+        history.index = to_utc(history.index)
+        merged = pd.concat([history, fetched])
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        merged[cached.columns].to_csv(path)
+        return len(new), 'rewritten'
+    if not new.empty:
+        new[cached.columns].to_csv(path, mode='a', header=False)
+    return len(new), 'appended'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Incremental concurrent 1-minute bar fetcher")
+    parser.add_argument('--source', choices=['yfinance', 'file'], default='yfinance')
+    parser.add_argument('--source-dir', default=None, help="folder of *_1min.csv files for --source file")
+    parser.add_argument('--workers', type=int, default=len(symbols))
+    parser.add_argument('--bus', action='store_true', help="also publish new bars to the shared-memory bus")
+    args = parser.parse_args()
+    if args.source == 'file' and not args.source_dir:
+        parser.error("--source file needs --source-dir")
 
-for symbol in symbols:
-    print(f"\n=== {symbol} ===")
-    df = yf.download(tickers=symbol, interval='1m', period='1d')
-    print(df.head())
+    # Make sure 'data' folder exists
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    source = FileSource(args.source_dir) if args.source == 'file' else YFinanceSource()
+    # One ring per symbol; each symbol is only ever published by its own worker
+    bus = None
+    if args.bus:
+        from bus import BusPublisher
+        bus = BusPublisher(symbols)
 
-    df.to_csv(f"data/{symbol}_1min.csv")
-    print(f"Saved to data/{symbol}_1min.csv")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(update_symbol, source, symbol, bus): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                n_new, how = future.result()
+                print(f"✅ {symbol}: {n_new} new bars ({how})")
+            except Exception as e:
+                print(f"❌ {symbol}: {e}")
+    print(f"Done in {time.perf_counter() - t0:.1f}s")
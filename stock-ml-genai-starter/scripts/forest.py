@@ -0,0 +1,108 @@
+# Flattened RandomForest for lightweight inference
+#
+# export_forest() copies every tree of a fitted sklearn forest into shared,
+# contiguous node arrays (feature, threshold, children, leaf probabilities)
+# saved as one .npz. FlatForest evaluates them with NumPy only: all
+# (sample, tree) pairs walk down together, one level per step, so a
+# prediction is max_depth vectorized gathers instead of a per-tree Python call.
+# Only numpy is needed to load and run it (no sklearn / joblib on the live box).
+# The feature names the forest was trained on travel with it (feature_names_in_).
+import os
+import numpy as np
+
+
+def export_forest(model, path, features=None):
+    features = getattr(model, 'feature_names_in_', None) if features is None else features
+    trees = [est.tree_ for est in model.estimators_]
+    sizes = np.array([t.node_count for t in trees])
+    roots = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+
+    feature, threshold, left, right, value, missing_left = [], [], [], [], [], []
+    for root, t in zip(roots, trees):
+        leaf = t.children_left == -1
+        nodes = np.arange(t.node_count) + root
+        # Leaves point at themselves so a fixed number of steps is harmless
+        left.append(np.where(leaf, nodes, t.children_left + root))
+        right.append(np.where(leaf, nodes, t.children_right + root))
+        feature.append(np.where(leaf, 0, t.feature))
+        threshold.append(t.threshold)
+        counts = t.value[:, 0, :]
+        value.append(counts / counts.sum(axis=1, keepdims=True))
+        mgl = getattr(t, 'missing_go_to_left', None)
+        missing_left.append(np.zeros(t.node_count, dtype=bool) if mgl is None else mgl.astype(bool))
+
+    np.savez(
+        path,
+        roots=roots,
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        left=np.concatenate(left).astype(np.int64),
+        right=np.concatenate(right).astype(np.int64),
+        value=np.concatenate(value).astype(np.float64),
+        missing_left=np.concatenate(missing_left),
+        max_depth=np.int64(max(t.max_depth for t in trees)),
+        classes=np.asarray(model.classes_),
+        n_features=np.int64(model.n_features_in_),
+        features=np.asarray([] if features is None else list(features), dtype=str),
+    )
+
+
+class FlatForest:
+    def __init__(self, arrays):
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.missing_left = arrays['missing_left']
+        self.max_depth = int(arrays['max_depth'])
+        self.classes_ = arrays['classes']
+        self.n_features_in_ = int(arrays['n_features'])
+        names = arrays.get('features')
+        self.feature_names_in_ = names.astype(object) if names is not None and len(names) else None
+        self.is_leaf = self.left == np.arange(len(self.left))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls({k: f[k] for k in f.files})
+
+    def apply(self, X):
+        # Leaf node index per (sample, tree); X is cast to float32 like sklearn does
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            if self.is_leaf[node].all():
+                break
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.missing_left[node], x <= self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X, chunk_rows=8192):
+        # Average of per-tree leaf probabilities, summed in tree order as sklearn does;
+        # large inputs go in chunks so the (rows x trees) node matrix stays small
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.empty((len(X), self.value.shape[1]))
+        for start in range(0, len(X), chunk_rows):
+            node = self.apply(X[start:start + chunk_rows])
+            out[start:start + chunk_rows] = self.value[node].sum(axis=1) / len(self.roots)
+        return out
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_model(pkl_path):
+    # Prefer the flattened .npz next to the pickle; only fall back to joblib if it's missing
+    flat_path = os.path.splitext(pkl_path)[0] + '.npz'
+    if os.path.exists(flat_path):
+        return FlatForest.load(flat_path)
+    import joblib
+    return joblib.load(pkl_path)
@@ -0,0 +1,463 @@
+# Streaming (O(1) per bar) technical indicators
+#
+# IndicatorEngine reproduces the pandas rolling/ewm code in create_features.py
+# bar by bar. The rolling sums and variances use the same compensated
+# add/remove updates as pandas' cython window kernels, and the EMAs use the
+# same recursion as ewm(adjust=False), so the output matches the batch
+# DataFrame computation without ever touching the full history again.
+import math
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SMA_WINDOWS = (5, 10, 20, 50)
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_WINDOW = 20
+
+OHLCV_COLUMNS = ['Close', 'High', 'Low', 'Open', 'Volume']
+FEATURE_COLUMNS = OHLCV_COLUMNS + [
+    'returns', 'SMA_5', 'SMA_10', 'SMA_20', 'SMA_50', 'RSI_14',
+    'golden_cross', 'death_cross', 'MACD', 'MACD_signal', 'MACD_hist',
+    'bollinger_mid', 'bollinger_upper', 'bollinger_lower', 'bollinger_bandwidth',
+]
+# Default inputs of the price direction model; a trained model carries its own list
+MODEL_FEATURES = ['Close', 'Volume', 'SMA_20', 'SMA_50', 'RSI_14', 'MACD', 'MACD_signal', 'MACD_hist']
+
+
+class RollingMean:
+    """Fixed-window mean over a ring buffer (pandas roll_mean semantics)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = math.nan
+
+    def update(self, val):
+        self.buf.append(val)
+        if len(self.buf) > self.window:
+            self._remove(self.buf.popleft())
+        self._add(val)
+        return self.value()
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        if val == self.prev_value:
+            self.same_ct += 1
+        else:
+            self.same_ct = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def value(self):
+        if self.nobs < self.window or self.nobs == 0:
+            return math.nan
+        result = self.sum_x / self.nobs
+        if self.same_ct >= self.nobs:
+            return self.prev_value
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class RollingStd:
+    """Fixed-window sample std (ddof=1) via Welford updates (pandas roll_var)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = math.nan
+
+    def update(self, val):
+        self.buf.append(val)
+        if len(self.buf) > self.window:
+            self._remove(self.buf.popleft())
+        self._add(val)
+        return self.value()
+
+    def _add(self, val):
+        if val != val:
+            return
+        if val == self.prev_value:
+            self.same_ct += 1
+        else:
+            self.same_ct = 1
+        self.prev_value = val
+        self.nobs += 1
+        prev_mean = self.mean_x - self.comp_add
+        y = val - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.comp_remove
+            y = val - self.comp_remove
+            t = y - self.mean_x
+            self.comp_remove = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def value(self):
+        if self.nobs < self.window or self.nobs <= 1:
+            return math.nan
+        if self.same_ct >= self.nobs:
+            return 0.0
+        var = self.ssqdm_x / (self.nobs - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class EMA:
+    """Recursive exponential moving average, same as ewm(span=..., adjust=False)."""
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.value = math.nan
+
+    def update(self, val):
+        if self.value != self.value:
+            self.value = val
+        elif val == val and self.value != val:
+            old_wt = 1.0 - self.alpha
+            self.value = (old_wt * self.value + self.alpha * val) / (old_wt + self.alpha)
+        return self.value
+
+
+def _div(a, b):
+    # numpy-style float division: x/0 -> +-inf, 0/0 -> nan
+    if b == 0:
+        if a != a or a == 0:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class IndicatorEngine:
+    """Stateful per-symbol feature engine; one update() per new bar.
+
+    Seed it once with the history (seed), then feed each new bar. Every update
+    returns the feature row in FEATURE_COLUMNS order as a float64 array; the
+    row is only "ready" once every rolling window is full, which is exactly
+    the set of rows that create_features.py keeps after dropna().
+    """
+
+    def __init__(self):
+        self.smas = {w: RollingMean(w) for w in SMA_WINDOWS}
+        self.avg_gain = RollingMean(RSI_WINDOW)
+        self.avg_loss = RollingMean(RSI_WINDOW)
+        self.std = RollingStd(BOLLINGER_WINDOW)
+        self.ema_fast = EMA(MACD_FAST)
+        self.ema_slow = EMA(MACD_SLOW)
+        self.ema_signal = EMA(MACD_SIGNAL)
+        self.prev_close = math.nan
+        self.prev_sma20 = math.nan
+        self.prev_sma50 = math.nan
+        self.last_ts = None
+        self.row = np.full(len(FEATURE_COLUMNS), np.nan)
+        self.ready = False
+
+    def update(self, ts, close, high, low, open_, volume):
+        delta = close - self.prev_close
+        returns = _div(close, self.prev_close) - 1
+        self.prev_close = close
+
+        sma = {w: m.update(close) for w, m in self.smas.items()}
+
+        # RSI: clip(lower=0) keeps NaN and -0.0, -clip(upper=0) turns 0.0 into -0.0
+        gain = delta if (delta != delta or delta >= 0) else 0.0
+        loss = -(delta if (delta != delta or delta <= 0) else 0.0)
+        rs = _div(self.avg_gain.update(gain), self.avg_loss.update(loss))
+        rsi = 100 - _div(100, 1 + rs)
+
+        sma20, sma50 = sma[20], sma[50]
+        golden = int(sma20 > sma50 and self.prev_sma20 <= self.prev_sma50)
+        death = int(sma20 < sma50 and self.prev_sma20 >= self.prev_sma50)
+        self.prev_sma20, self.prev_sma50 = sma20, sma50
+
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        signal = self.ema_signal.update(macd)
+
+        std = self.std.update(close)
+        upper = sma20 + 2 * std
+        lower = sma20 - 2 * std
+
+        self.row = np.array([
+            close, high, low, open_, volume,
+            returns, sma[5], sma[10], sma20, sma50, rsi,
+            golden, death, macd, signal, macd - signal,
+            sma20, upper, lower, upper - lower,
+        ], dtype=np.float64)
+        self.ready = not np.isnan(self.row).any()
+        self.last_ts = ts
+        return self.row
+
+    def features(self):
+        return dict(zip(FEATURE_COLUMNS, self.row))
+
+    def seed(self, df):
+        """Feed a block of bars (the full history once, afterwards only the new ones).
+
+        Returns the ready rows as a DataFrame with the create_features.py columns.
+        """
+        import pandas as pd
+
+        cols = [df[c].to_numpy(dtype=np.float64) for c in OHLCV_COLUMNS]
+        rows, index = [], []
+        for i, ts in enumerate(df.index):
+            row = self.update(ts, *(c[i] for c in cols))
+            if self.ready:
+                rows.append(row)
+                index.append(ts)
+        out = pd.DataFrame(rows, index=pd.Index(index, name=df.index.name), columns=FEATURE_COLUMNS)
+        out[['golden_cross', 'death_cross']] = out[['golden_cross', 'death_cross']].astype(int)
+        return out
+
+
+# --- Panel (time x symbol) version of IndicatorEngine
+def _rolling(x, window, square=False):
+    # Mean (or sample std) of the last `window` values along axis 0 (every
+    # column of a 2-D array at once), NaN unless all of them are present.
+    # Every window is summed on its own (no running sums that drift over long
+    # histories); a constant window gives its value (std 0) exactly, like the
+    # streaming kernels.
+    out = np.full(x.shape, np.nan)
+    if len(x) < window:
+        return out
+    w = sliding_window_view(x, window, axis=0)
+    mean = w.sum(axis=-1) / window
+    flat = w.min(axis=-1) == w.max(axis=-1)
+    if square:
+        dev = w - mean[..., None]
+        std = np.sqrt((dev * dev).sum(axis=-1) / (window - 1))
+        out[window - 1:] = np.where(flat, 0.0, std)
+    else:
+        out[window - 1:] = np.where(flat, w[..., -1], mean)
+    return out
+
+
+def _shift(x):
+    # x one step later along axis 0, NaN first
+    return np.concatenate([np.full((1,) + x.shape[1:], np.nan), x[:-1]])
+
+
+def _window_features(ext):
+    # Rolling features down the columns of consecutive observed closes:
+    # returns, SMAs, RSI, crosses, Bollinger (arrays shaped like ext)
+    prev = _shift(ext)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = ext - prev
+        returns = ext / prev - 1
+        sma = {w: _rolling(ext, w) for w in SMA_WINDOWS}
+        gain = np.where(np.isnan(delta) | (delta >= 0), delta, 0.0)
+        loss = -np.where(np.isnan(delta) | (delta <= 0), delta, 0.0)
+        rs = _rolling(gain, RSI_WINDOW) / _rolling(loss, RSI_WINDOW)
+        rsi = 100 - 100 / (1 + rs)
+    sma20, sma50 = sma[20], sma[50]
+    prev20, prev50 = _shift(sma20), _shift(sma50)
+    golden = (sma20 > sma50) & (prev20 <= prev50)
+    death = (sma20 < sma50) & (prev20 >= prev50)
+    std = _rolling(ext, BOLLINGER_WINDOW, square=True)
+    upper = sma20 + 2 * std
+    lower = sma20 - 2 * std
+    return {
+        'returns': returns, 'SMA_5': sma[5], 'SMA_10': sma[10], 'SMA_20': sma20, 'SMA_50': sma50,
+        'RSI_14': rsi, 'golden_cross': golden, 'death_cross': death,
+        'bollinger_mid': sma20, 'bollinger_upper': upper, 'bollinger_lower': lower,
+        'bollinger_bandwidth': upper - lower,
+    }
+
+
+def _ema_step(value, x, alpha):
+    # EMA.update for a whole row of symbols; NaN (no bar) leaves the state alone
+    old_wt = 1.0 - alpha
+    new = (old_wt * value + alpha * x) / (old_wt + alpha)
+    return np.where(np.isnan(value), x, np.where(~np.isnan(x) & (value != x), new, value))
+
+
+_COLUMN = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+
+
+class PanelEngine:
+    """IndicatorEngine for many symbols at once on a shared time grid.
+
+    update_block() takes (rows x symbols) OHLCV arrays with NaN where a symbol
+    has no bar and returns a (rows x features x symbols) cube, features in
+    FEATURE_COLUMNS order, plus a (rows x symbols) mask of rows that are both
+    observed and ready. Every symbol's windows run over its own observed bars
+    only, exactly like a per-symbol IndicatorEngine: grid rows a symbol has no
+    bar in are skipped, not filled. Each symbol's last CONTEXT closes and the
+    EMA states carry over between calls, so the history can be fed in time
+    chunks of any size. Rolling means are plain window sums instead of
+    pandas' running kernels, so values match the streaming engine to
+    rounding, not bit for bit.
+
+    The rolling windows run on the whole block at once: each symbol's
+    observed closes are packed to the bottom of its column, under its
+    carried tail, with NaN above, so a window that reaches past a symbol's
+    history is NaN like a short 1-D one. The EMAs are recursive and stay a
+    loop over grid rows, vectorized across symbols only.
+    """
+
+    CONTEXT = max(max(SMA_WINDOWS), BOLLINGER_WINDOW, RSI_WINDOW + 1) + 1
+
+    def __init__(self, n_symbols):
+        self.tail = np.full((self.CONTEXT, n_symbols), np.nan)   # last closes, NaN above short histories
+        self.last_row = np.full((len(FEATURE_COLUMNS), n_symbols), np.nan)
+        self.alphas = [1.0 / (1.0 + (span - 1) / 2.0) for span in (MACD_FAST, MACD_SLOW, MACD_SIGNAL)]
+        self.ema_fast = np.full(n_symbols, np.nan)
+        self.ema_slow = np.full(n_symbols, np.nan)
+        self.ema_signal = np.full(n_symbols, np.nan)
+
+    def update_block(self, close, high, low, open_, volume):
+        close = np.asarray(close, dtype=np.float64)
+        present = ~np.isnan(close)
+        cube = np.full((close.shape[0], len(FEATURE_COLUMNS), close.shape[1]), np.nan)
+        for name, values in zip(OHLCV_COLUMNS, (close, high, low, open_, volume)):
+            cube[:, _COLUMN[name]] = np.where(present, values, np.nan)
+
+        # Rolling features: pack each symbol's bars of this block to the bottom
+        # of its column, right under its carried tail, and run the windows on all columns at once
+        rows, cols = np.nonzero(present)
+        n_obs = present.sum(axis=0)
+        depth = self.CONTEXT + n_obs.max(initial=0)
+        at = depth - n_obs[cols] + (np.cumsum(present, axis=0)[rows, cols] - 1)
+        ext = np.full((depth, close.shape[1]), np.nan)
+        ext[depth - n_obs - self.CONTEXT + np.arange(self.CONTEXT)[:, None], np.arange(close.shape[1])] = self.tail
+        ext[at, cols] = close[rows, cols]
+        for name, values in _window_features(ext).items():
+            cube[rows, _COLUMN[name], cols] = values[at, cols]
+        self.tail = ext[-self.CONTEXT:]
+
+        # EMAs are recursive: one vectorized step per grid row, state carried to the next block
+        fast_a, slow_a, signal_a = self.alphas
+        macd = np.full(close.shape, np.nan)
+        signal = np.full(close.shape, np.nan)
+        for i, row in enumerate(close):
+            self.ema_fast = _ema_step(self.ema_fast, row, fast_a)
+            self.ema_slow = _ema_step(self.ema_slow, row, slow_a)
+            m = np.where(present[i], self.ema_fast - self.ema_slow, np.nan)
+            self.ema_signal = _ema_step(self.ema_signal, m, signal_a)
+            macd[i], signal[i] = m, np.where(present[i], self.ema_signal, np.nan)
+        cube[:, _COLUMN['MACD']] = macd
+        cube[:, _COLUMN['MACD_signal']] = signal
+        cube[:, _COLUMN['MACD_hist']] = macd - signal
+        ready = present & ~np.isnan(cube).any(axis=1)
+
+        # Last observed row per symbol, for symbol_engine()
+        seen = present.any(axis=0)
+        last = len(close) - 1 - present[::-1].argmax(axis=0)
+        self.last_row[:, seen] = cube[last[seen], :, np.flatnonzero(seen)].T
+        return cube, ready
+
+    def symbol_engine(self, j, bars):
+        """IndicatorEngine that continues symbol j, given its last bars (>= CONTEXT rows).
+
+        Lets create_features.py resume incrementally after a panel rebuild.
+        """
+        engine = IndicatorEngine()
+        engine.seed(bars.iloc[-self.CONTEXT:])
+        engine.ema_fast.value, engine.ema_slow.value = self.ema_fast[j], self.ema_slow[j]
+        engine.ema_signal.value = self.ema_signal[j]
+        engine.row = self.last_row[:, j].copy()
+        engine.ready = not np.isnan(engine.row).any()
+        return engine
+
+
+def panel_features(frames, chunk_rows=None, engine=None):
+    """Features for a dict of symbol -> OHLCV DataFrame via one PanelEngine.
+
+    Bars are aligned on the union of all timestamps and processed chunk_rows
+    grid rows at a time (all at once if None), so memory is bounded by the
+    chunk. Yields one dict of symbol -> ready feature rows per chunk. Pass an
+    engine (PanelEngine(len(frames))) to keep its state after the last chunk.
+    """
+    import pandas as pd
+
+    symbols = list(frames)
+    grid = frames[symbols[0]].index
+    for s in symbols[1:]:
+        grid = grid.union(frames[s].index)
+    # Position of each symbol's bars on the grid, and its OHLCV columns
+    pos = [grid.get_indexer(frames[s].index) for s in symbols]
+    cols = [{c: frames[s][c].to_numpy(dtype=np.float64) for c in OHLCV_COLUMNS} for s in symbols]
+
+    engine = engine or PanelEngine(len(symbols))
+    chunk_rows = chunk_rows or max(len(grid), 1)
+    for start in range(0, len(grid), chunk_rows):
+        stop = min(start + chunk_rows, len(grid))
+        block = {c: np.full((stop - start, len(symbols)), np.nan) for c in OHLCV_COLUMNS}
+        for j in range(len(symbols)):
+            lo, hi = np.searchsorted(pos[j], [start, stop])
+            for c in OHLCV_COLUMNS:
+                block[c][pos[j][lo:hi] - start, j] = cols[j][c][lo:hi]
+        cube, ready = engine.update_block(*(block[c] for c in OHLCV_COLUMNS))
+        index = grid[start:stop]
+        out = {}
+        for j, s in enumerate(symbols):
+            rows = ready[:, j]
+            df = pd.DataFrame(cube[rows, :, j], index=index[rows], columns=FEATURE_COLUMNS)
+            df.index.name = frames[s].index.name
+            df[['golden_cross', 'death_cross']] = df[['golden_cross', 'death_cross']].astype(int)
+            out[s] = df
+        yield out
+
+
+# --- Batch (pandas) versions with configurable windows, used by the sweep
+def sma(close, window):
+    return close.rolling(window=window).mean()
+
+
+def rsi(close, window=RSI_WINDOW):
+    delta = close.diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    rs = gain.rolling(window=window).mean() / loss.rolling(window=window).mean()
+    return 100 - (100 / (1 + rs))
+
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    line = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+    sig = line.ewm(span=signal, adjust=False).mean()
+    return line, sig, line - sig
@@ -1,27 +1,39 @@
 
 # For BUY/SELL of AAPL stock based on a pre-trained model
-# This script loads the model, predicts the price direction, and decides on a trade action
-import pandas as pd
-import os
-import joblib
+# This script asks the local prediction server (predict_server.py) for the
+# price direction, or loads the model itself when the server isn't running,
+# and decides on a trade action
 from datetime import datetime
 
+import predict_client
+from trade_log_writer import TradeLogWriter
+
 # Settings
 symbol = 'AAPL'
 capital = 10_000          # total capital
 risk_per_trade = 0.01     # risk 1% per trade
 stop_loss_pct = 0.005     # stop loss 0.5%
 
-# --- Load latest data
-df = pd.read_csv(f"data/{symbol}_features.csv", index_col=0, parse_dates=True)
-latest = df.iloc[-1:]
-current_price = latest['Close'].values[0]
+try:
+    # --- Warm model in the prediction server: it reads the latest row itself
+    result = predict_client.predict(symbol)
+    current_price, proba, pred = result['price'], result['proba'], result['class']
+    source = f"server, model {result['version']}" + (" (cached)" if result['cached'] else "")
+except OSError as e:
+    print(f"⚠️ Prediction server unavailable ({e}); loading the model")
+    from feature_store import load_latest
+    from indicators import FEATURE_COLUMNS
+    import registry
+
+    # --- Load latest data (full feature row, FEATURE_COLUMNS order)
+    row = load_latest(symbol, 1, columns=FEATURE_COLUMNS).to_numpy(dtype=float)[0]
+    current_price = row[0]   # Close
 
-# --- Load model & predict
-model = joblib.load('models/price_direction_rf.pkl')
-features = ['Close', 'Volume', 'SMA_20', 'SMA_50', 'RSI_14', 'MACD', 'MACD_signal', 'MACD_hist']
-pred = model.predict(latest[features])[0]
-proba = model.predict_proba(latest[features])[0]
+    # --- Load current registry model & predict (it selects its own columns from the row)
+    model = registry.load()
+    proba = model.predict_proba(row)[0]
+    pred = model.classes_[proba.argmax()]
+    source = f"local, model {model.version}"
 
 # --- Decide position size
 dollar_risk = capital * risk_per_trade   # e.g. $100 risk per trade
@@ -43,20 +55,12 @@ else:
 print(f"\n=== {datetime.now()} ===")
 print(f"Symbol: {symbol}")
 print(f"Price: {current_price:.2f}")
-print(f"Pred: {pred} Prob: {proba}")
+print(f"Pred: {pred} Prob: {proba} ({source})")
 print(f"Action: {action} | Qty: {qty} | Stop Loss: {stop_price:.2f}" if stop_price else f"Action: {action}")
 
 # --- Log to file
+trade_log = TradeLogWriter('trade_logs')
+trade_log.log(symbol, current_price, action, qty, stop_price, proba=proba[1])
+trade_log.close()
 
-# Make sure the folder exists
-os.makedirs('trade_logs', exist_ok=True)
-
-# Build log filename per day
-log_filename = datetime.now().strftime("trade_logs/trades_%Y-%m-%d.txt")
-
-log_entry = f"{datetime.now()}, {symbol}, {current_price:.2f}, {action}, {qty}, {stop_price}\n"
-
-with open(log_filename, "a", encoding="utf-8") as f:
-    f.write(log_entry)
-
-print(f"✅ Trade logged to {log_filename}")
+print(f"✅ Trade logged to {trade_log.path_for(datetime.now().strftime('%Y-%m-%d'))}")
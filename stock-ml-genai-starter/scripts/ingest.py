@@ -0,0 +1,131 @@
+# Append-only ingestion for the live loops
+#
+# TailReader remembers the byte offset it has parsed up to and, on each poll,
+# reads only what was appended since. On start it bootstraps its rolling
+# window from the last few KB of the file instead of parsing the whole thing.
+# If the file shrinks or is replaced (e.g. fetch_data.py rewrote it) the
+# reader re-bootstraps and only hands back bars newer than the last one seen.
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['Close', 'High', 'Low', 'Open', 'Volume']
+
+
+class TailReader:
+    def __init__(self, path, window=500, block_size=64 * 1024):
+        self.path = path
+        self.window = deque(maxlen=window)   # (timestamp, float64 array) per bar
+        self.block_size = block_size
+        self.columns = None
+        self.offset = 0
+        self.inode = None
+        self.partial = b''
+        self.last_ts = None
+
+    # --- Parsing
+    def _read_header(self, f):
+        f.seek(0)
+        header = f.readline().decode('utf-8').strip().split(',')
+        self.columns = header[1:]
+        self._ohlcv_idx = [self.columns.index(c) for c in OHLCV_COLUMNS]
+        return f.tell()
+
+    def _parse(self, line):
+        # Returns (ts, values) or None for yfinance's Ticker/Datetime rows and junk
+        parts = line.decode('utf-8').strip().split(',')
+        if len(parts) != len(self.columns) + 1:
+            return None
+        try:
+            ts = datetime.fromisoformat(parts[0])
+            values = np.array([float(v) for v in parts[1:]], dtype=np.float64)
+        except ValueError:
+            return None
+        return ts, values
+
+    def _accept(self, lines):
+        new = []
+        for line in lines:
+            bar = self._parse(line)
+            if bar is None or (self.last_ts is not None and bar[0] <= self.last_ts):
+                continue
+            self.window.append(bar)
+            self.last_ts = bar[0]
+            new.append(bar)
+        return new
+
+    # --- Reading
+    def _bootstrap(self, f, size):
+        # Fill the window from the end of the file, growing the read until it holds enough lines
+        header_end = self._read_header(f)
+        need = self.window.maxlen
+        start = size
+        while True:
+            start = max(header_end, start - self.block_size)
+            f.seek(start)
+            lines = f.read(size - start).split(b'\n')
+            if start > header_end:
+                lines = lines[1:]           # first line is probably cut in half
+            complete, tail = lines[:-1], lines[-1]
+            if len(complete) >= need + 2 or start == header_end:
+                break
+        self.partial = tail
+        self.offset = size
+        return self._accept(complete[-(need + 2):])
+
+    def poll(self):
+        """Parse bars appended since the last call; returns a list of (timestamp, values)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        with open(self.path, 'rb') as f:
+            if self.columns is None or st.st_ino != self.inode or st.st_size < self.offset:
+                self.inode = st.st_ino
+                return self._bootstrap(f, st.st_size)
+            if st.st_size == self.offset:
+                return []
+            f.seek(self.offset)
+            chunk = f.read(st.st_size - self.offset)
+        self.offset += len(chunk)
+        lines = (self.partial + chunk).split(b'\n')
+        self.partial = lines.pop()
+        return self._accept(lines)
+
+    # --- Window access
+    def ohlcv(self, values):
+        # Reorder a parsed row into IndicatorEngine.update() argument order
+        return values[self._ohlcv_idx]
+
+    def latest(self):
+        if not self.window:
+            return None, None
+        ts, values = self.window[-1]
+        return ts, dict(zip(self.columns, values))
+
+    def frame(self):
+        if not self.window:
+            return pd.DataFrame(columns=self.columns)
+        index, rows = zip(*self.window)
+        return pd.DataFrame(np.vstack(rows), index=pd.DatetimeIndex(index), columns=self.columns)
+
+    def wait(self, timeout):
+        # A file has no change notification: just sleep until the next poll (bus.BusReader returns early)
+        time.sleep(timeout)
+
+
+class BarFeed:
+    """One TailReader per symbol over data/{symbol}_1min.csv."""
+
+    def __init__(self, symbols, data_folder='data', window=500):
+        self.readers = {s: TailReader(os.path.join(data_folder, f"{s}_1min.csv"), window) for s in symbols}
+
+    def poll(self):
+        return {s: r.poll() for s, r in self.readers.items()}
+
+    def wait(self, timeout):
+        time.sleep(timeout)
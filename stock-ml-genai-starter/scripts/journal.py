@@ -0,0 +1,101 @@
+# Crash-safe persistence for the position book
+#
+# Every fill is appended to positions.journal as one fixed-width record
+# (FILL_DTYPE) and fsync'ed before the live loop moves on, so a tick only
+# writes what changed. Every `compact_every` fills the whole book is written
+# to positions.npz (temp file + atomic rename) together with the sequence
+# number of the last fill it contains, and the journal is truncated.
+# On startup the snapshot is loaded and the newer journal records replayed
+# through Portfolio.fill, which rebuilds the book exactly; a torn record at
+# the end of the journal (crash mid-append) is ignored.
+import os
+import atexit
+import numpy as np
+
+from portfolio import Portfolio
+
+FILL_DTYPE = np.dtype([
+    ("seq", "i8"), ("symbol", "U12"), ("qty", "i8"), ("price", "f8"), ("stop", "f8"),
+])
+
+
+class FillJournal:
+    def __init__(self, folder="trade_logs", name="positions", compact_every=500, sync=True):
+        self.snapshot_path = os.path.join(folder, f"{name}.npz")
+        self.journal_path = os.path.join(folder, f"{name}.journal")
+        self.compact_every = compact_every
+        self.sync = sync
+        self.seq = 0           # sequence number of the last fill written
+        self.pending = 0       # fills in the journal since the last snapshot
+        self.book = None
+        self.file = None
+        os.makedirs(folder, exist_ok=True)
+
+    def open(self, symbols=()):
+        # Snapshot + journal replay -> Portfolio; further fills on it are journaled
+        book, snap_seq = Portfolio(symbols), 0
+        if os.path.exists(self.snapshot_path):
+            with np.load(self.snapshot_path) as f:
+                snap = {k: f[k] for k in f.files}
+            book, snap_seq = Portfolio.restore(snap), int(snap.get("seq", 0))
+            for symbol in symbols:
+                book.slot(symbol)
+        self.seq = snap_seq
+        self.pending = 0
+        records = self.records()
+        for rec in records:
+            if rec["seq"] <= snap_seq:
+                continue   # already in the snapshot (crash between snapshot and truncate)
+            stop = None if np.isnan(rec["stop"]) else float(rec["stop"])
+            book.fill(str(rec["symbol"]), int(rec["qty"]), float(rec["price"]), stop)
+            self.seq = int(rec["seq"])
+            self.pending += 1
+        # Drop a torn trailing record so new appends stay aligned
+        size = len(records) * FILL_DTYPE.itemsize
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) != size:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(size)
+        self.file = open(self.journal_path, "ab")
+        atexit.register(self.close)
+        self.book = book
+        book.journal = self
+        return book
+
+    def records(self):
+        if not os.path.exists(self.journal_path):
+            return np.empty(0, dtype=FILL_DTYPE)
+        n = os.path.getsize(self.journal_path) // FILL_DTYPE.itemsize
+        return np.fromfile(self.journal_path, dtype=FILL_DTYPE, count=n)
+
+    def append(self, symbol, qty, price, stop=None):
+        # Called by Portfolio.fill for every non-empty fill
+        self.seq += 1
+        rec = np.array([(self.seq, symbol, qty, price, np.nan if stop is None else stop)], dtype=FILL_DTYPE)
+        self.file.write(rec.tobytes())
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+        self.pending += 1
+
+    def checkpoint(self, force=False):
+        # Compact once enough fills have accumulated; cheap no-op otherwise
+        if not force and self.pending < self.compact_every:
+            return False
+        snap = self.book.snapshot()
+        snap["seq"] = np.int64(self.seq)
+        tmp = f"{self.snapshot_path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **snap)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        # The snapshot now covers every journaled fill
+        self.file.truncate(0)
+        self.file.seek(0)
+        self.pending = 0
+        return True
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.checkpoint(force=True)
+            self.file.close()
@@ -0,0 +1,188 @@
+# Latency spans, rolling percentiles and an optional sampling profiler
+#
+# with metrics.span('predict', symbol): ... times a stage with perf_counter_ns
+# and stores the duration in a fixed-size ring buffer per (stage, symbol), so
+# recording is O(1) and the percentiles always describe the last `window`
+# calls. An exception inside a span is counted as an error for that stage
+# and re-raised. A background thread writes a JSON snapshot (count, errors,
+# last, p50/p95/p99, max per stage and symbol) to
+# trade_logs/latency_{name}.json every few seconds for the dashboard.
+#
+# The sampling profiler records the main thread's stack every few ms and
+# writes collapsed stacks (flamegraph.pl / speedscope format) next to it.
+# It is off by default: set PROFILE=1, or create trade_logs/PROFILE while the
+# loop is running to turn it on (delete the file to turn it off again).
+import os
+import sys
+import atexit
+import json
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+ALL = '*'   # symbol label of the aggregate over all symbols
+
+
+class _Ring:
+    __slots__ = ('values', 'n', 'errors', 'last')
+
+    def __init__(self, window):
+        self.values = np.zeros(window)
+        self.n = 0
+        self.errors = 0
+        self.last = np.nan
+
+    def add(self, ms):
+        self.values[self.n % len(self.values)] = ms
+        self.n += 1
+        self.last = ms
+
+    def summary(self):
+        filled = self.values[:min(self.n, len(self.values))]
+        p50, p95, p99 = np.percentile(filled, [50, 95, 99]) if len(filled) else (np.nan,) * 3
+        return {'count': self.n, 'errors': self.errors, 'last_ms': self.last,
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                'max_ms': filled.max() if len(filled) else np.nan}
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(f"{path}.tmp", 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(f"{path}.tmp", path)
+
+
+class LatencyRecorder:
+    def __init__(self, name, folder='trade_logs', window=1000, export_interval=5.0):
+        self.name = name
+        self.folder = folder
+        self.window = window
+        self.rings = {}   # (stage, symbol) -> _Ring
+        self.lock = threading.Lock()
+        self.path = os.path.join(folder, f"latency_{name}.json")
+        self.profile_path = os.path.join(folder, f"profile_{name}.txt")
+        self.toggle_path = os.path.join(folder, 'PROFILE')
+        self.profiler = SamplingProfiler()
+        self.export_interval = export_interval
+        self._stop = threading.Event()
+        os.makedirs(folder, exist_ok=True)
+        if os.environ.get('PROFILE') == '1':
+            self.profiler.start()
+        self.thread = threading.Thread(target=self._run, name=f"latency-{name}", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _ring(self, stage, symbol):
+        ring = self.rings.get((stage, symbol))
+        if ring is None:
+            with self.lock:
+                ring = self.rings.setdefault((stage, symbol), _Ring(self.window))
+        return ring
+
+    def record(self, stage, ms, symbol=ALL):
+        self._ring(stage, symbol).add(ms)
+        if symbol != ALL:
+            self._ring(stage, ALL).add(ms)
+
+    def error(self, stage, symbol=ALL):
+        self._ring(stage, symbol).errors += 1
+        if symbol != ALL:
+            self._ring(stage, ALL).errors += 1
+
+    @contextmanager
+    def span(self, stage, symbol=ALL):
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        except Exception:
+            self.error(stage, symbol)
+            raise
+        finally:
+            self.record(stage, (time.perf_counter_ns() - t0) / 1e6, symbol)
+
+    def snapshot(self):
+        with self.lock:
+            items = list(self.rings.items())
+        rows = []
+        for (stage, symbol), ring in sorted(items):
+            row = {'stage': stage, 'symbol': symbol, **ring.summary()}
+            rows.append({k: (None if isinstance(v, float) and v != v else v) for k, v in row.items()})
+        return {'name': self.name, 'pid': os.getpid(), 'updated': datetime.now().isoformat(timespec='seconds'),
+                'profiling': self.profiler.running, 'stages': rows}
+
+    def export(self):
+        data = json.dumps(self.snapshot(), default=float)
+        with open(f"{self.path}.tmp", 'w') as f:
+            f.write(data)
+        os.replace(f"{self.path}.tmp", self.path)
+        if self.profiler.stacks:
+            self.profiler.write(self.profile_path)
+
+    def _run(self):
+        while not self._stop.wait(self.export_interval):
+            try:
+                # Runtime profiler toggle: the PROFILE file (or PROFILE=1 at start)
+                if os.path.exists(self.toggle_path) or os.environ.get('PROFILE') == '1':
+                    self.profiler.start()
+                elif self.profiler.running:
+                    self.profiler.stop()
+                self.export()
+            except Exception as e:
+                print(f"⚠️ Latency export failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.profiler.stop()
+        self.export()
+
+
+def read_latency(folder='trade_logs'):
+    # All exported snapshots as one DataFrame (for the dashboard)
+    import glob
+    import pandas as pd
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(folder, 'latency_*.json'))):
+        with open(path) as f:
+            data = json.load(f)
+        df = pd.DataFrame(data['stages'])
+        df.insert(0, 'loop', data['name'])
+        df['updated'] = data['updated']
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -1,95 +1,115 @@
-import os
 import time
-import pandas as pd
-import joblib
+import numpy as np
 import datetime as dt
 from pathlib import Path
 
+from indicators import IndicatorEngine
+from ingest import BarFeed
+from bus import BusFeed
+from registry import ModelWatcher
+from trade_log import TradeLogWriter
+from journal import FillJournal
+from latency import LatencyRecorder
+
 # === Settings ===
 SYMBOLS = ["AAPL", "GOOGL", "AMZN", "MSFT"]  # symbols you have data for
-MODEL_PATH = "models/my_model.pkl"
 DATA_FOLDER = "data"
 TRADE_LOG_FOLDER = "trade_logs"
-POSITION_FILE = "trade_logs/positions.csv"  # to track open positions
 SLEEP_SECONDS = 60  # loop every minute
 POSITION_SIZE = 10  # number of shares per trade
+USE_BUS = False  # take bars from the shared-memory bus (fetch_data.py --bus) instead of tailing the CSVs
 
 # === Prepare folders ===
 Path(TRADE_LOG_FOLDER).mkdir(exist_ok=True)
 
-# === Load model once ===
-model = joblib.load(MODEL_PATH)
+trade_log = TradeLogWriter(TRADE_LOG_FOLDER)
+
+# Per-stage timings -> trade_logs/latency_live_trader.json (PROFILE=1 or a trade_logs/PROFILE file samples stacks)
+metrics = LatencyRecorder('live_trader', TRADE_LOG_FOLDER)
+
+# === Current registry model (hot-swapped between cycles when a new version is published) ===
+watcher = ModelWatcher()
 
-# === Initialize PnL ===
-realized_pnl = 0
-positions = {}  # symbol -> {'entry_price': float, 'qty': int}
+engines = {s: IndicatorEngine() for s in SYMBOLS}  # fed only bars the feed hasn't seen
+feed = BusFeed(SYMBOLS) if USE_BUS else BarFeed(SYMBOLS, DATA_FOLDER)
 
-# === Restore previous positions if exist ===
-if os.path.exists(POSITION_FILE):
-    df_pos = pd.read_csv(POSITION_FILE, index_col=0)
-    for sym, row in df_pos.iterrows():
-        positions[sym] = {"entry_price": row['entry_price'], "qty": row['qty']}
-    print(f"Restored positions: {positions}")
+# === Restore positions: last snapshot + journaled fills since (trade_logs/positions.*) ===
+journal = FillJournal(TRADE_LOG_FOLDER)
+book = journal.open(SYMBOLS)  # qty / avg entry / realized PnL per symbol; fills are journaled
+if journal.seq:
+    print(f"Restored positions:\n{book.frame()}")
 
 # === Start live loop ===
 while True:
+    cycle_start = time.perf_counter_ns()
+    # 1️⃣ Read only the bars appended since the last poll & update features incrementally
+    active = []
     for symbol in SYMBOLS:
         try:
-            # 1️⃣ Load latest data
-            df = pd.read_csv(f"{DATA_FOLDER}/{symbol}_1min.csv", index_col=0, parse_dates=True)
-            
-            # 2️⃣ Compute features (replace with your actual feature logic)
-            df["returns"] = df["Close"].pct_change()
-            df["ma_5"] = df["Close"].rolling(5).mean()
-            df["ma_20"] = df["Close"].rolling(20).mean()
-
-            # 3️⃣ Take latest row's features
-            last_row = df.iloc[-1:]
-            features = last_row[["returns", "ma_5", "ma_20"]].fillna(0)
-
-            # 4️⃣ Predict
-            prob = model.predict_proba(features)[0]
-            will_go_up = prob[1] > 0.5
-            price = last_row["Close"].values[0]
-
-            # 5️⃣ Decide action
+            reader = feed.readers[symbol]
+            engine = engines[symbol]
+            with metrics.span('poll', symbol):
+                new_bars = reader.poll()
+            with metrics.span('features', symbol):
+                for ts, values in new_bars:
+                    engine.update(ts, *reader.ohlcv(values))
+            if engine.last_ts is not None:
+                active.append(symbol)
+        except Exception as e:
+            print(f"Error with {symbol}: {e}")
+
+    # 2️⃣ One feature matrix for all symbols -> one predict_proba call per cycle
+    probs = {}
+    if active:
+        try:
+            model = watcher.active
+            with metrics.span('predict'):
+                # Engine rows (missing values as 0) -> the model selects its columns
+                rows = np.nan_to_num(np.vstack([engines[s].row for s in active]), nan=0.0)
+                probs = dict(zip(active, model.predict_proba(rows)[:, model.up_idx]))
+        except Exception as e:
+            print(f"Prediction error: {e}")
+
+    for symbol, prob in probs.items():
+        try:
+            # 3️⃣ Decide action
+            will_go_up = prob > 0.5
+            price = engines[symbol].row[0]  # Close
             action = "BUY" if will_go_up else "SELL"
             qty = POSITION_SIZE
-            now = dt.datetime.utcnow().isoformat()
+            now = dt.datetime.utcnow()
 
             decision = ""
-            if action == "BUY":
-                # open or update position
-                positions[symbol] = {"entry_price": price, "qty": qty}
-                decision = "✅ BUY"
-            else:
-                if symbol in positions:
-                    # close position & compute realized PnL
-                    entry = positions.pop(symbol)
-                    trade_pnl = (price - entry["entry_price"]) * entry["qty"]
-                    realized_pnl += trade_pnl
-                    decision = f"❌ SELL, realized PnL: {trade_pnl:.2f}"
+            with metrics.span('decide', symbol):
+                if action == "BUY":
+                    # open position, or top it up to POSITION_SIZE
+                    book.fill(symbol, qty - book.position(symbol), price)
+                    decision = "✅ BUY"
                 else:
-                    decision = "❌ SELL, no open position"
+                    if book.position(symbol):
+                        # close position & compute realized PnL
+                        trade_pnl = book.close(symbol, price)
+                        decision = f"❌ SELL, realized PnL: {trade_pnl:.2f}"
+                    else:
+                        decision = "❌ SELL, no open position"
+                realized_pnl = book.realized_pnl()
 
-            # 6️⃣ Log trade
-            log_line = f"{now},{symbol},{price:.2f},{action},{qty},{realized_pnl:.2f},{prob[1]:.2f}\n"
-            log_file = f"{TRADE_LOG_FOLDER}/trades_{dt.date.today()}.txt"
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(log_line)
+            # 4️⃣ Log trade (buffered)
+            with metrics.span('log', symbol):
+                trade_log.log(symbol, price, action, qty, pnl=realized_pnl, proba=prob, time=now)
 
-            print(f"{now} | {symbol} | {action} @ {price:.2f} | {decision} | Total PnL: {realized_pnl:.2f}")
+            print(f"{now.isoformat()} | {symbol} | {action} @ {price:.2f} | {decision} | Total PnL: {realized_pnl:.2f}")
 
         except Exception as e:
             print(f"Error with {symbol}: {e}")
 
-    # 7️⃣ Save positions to CSV (dashboard can read)
-    if positions:
-        df_pos = pd.DataFrame.from_dict(positions, orient='index')
-        df_pos.to_csv(POSITION_FILE)
-    else:
-        if os.path.exists(POSITION_FILE):
-            os.remove(POSITION_FILE)
+    # 5️⃣ Mark all open positions in one pass; compact the journal now and then
+    with metrics.span('persist'):
+        book.mark({s: engines[s].row[0] for s in active})
+        journal.checkpoint()
+    if active:
+        print(f"Open PnL: {book.unrealized().sum():.2f} | Total PnL: {book.total_pnl():.2f}")
+    metrics.record('cycle', (time.perf_counter_ns() - cycle_start) / 1e6)
 
-    # 8️⃣ Sleep before next loop
-    time.sleep(10)
+    # 6️⃣ Sleep before next loop
+    feed.wait(10)   # the bus returns as soon as any symbol has a new bar
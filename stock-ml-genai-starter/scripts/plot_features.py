@@ -1,8 +1,9 @@
 import os
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 
+from feature_store import load_features
+
 # Streamlit dropdown
 symbol = st.selectbox(
     "Choose a symbol",
@@ -12,11 +13,11 @@ symbol = st.selectbox(
 # Load feature data
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-file_path = os.path.abspath(
-    os.path.join(BASE_DIR, "..", "..", "data", f"{symbol}_features.csv")
-)
+ROOT_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", ".."))
 
-df = pd.read_csv(file_path, index_col=0, parse_dates=True)
+df = load_features(symbol,
+                   root=os.path.join(ROOT_DIR, "store"),
+                   data_folder=os.path.join(ROOT_DIR, "data"))
 
 # Price + SMAs + Bollinger Bands
 st.subheader(f"Price with SMAs & Bollinger Bands")
@@ -0,0 +1,161 @@
+# Position accounting for the live scripts
+#
+# One slot per symbol in flat NumPy arrays: signed quantity (+ long, - short),
+# average entry price, realized PnL, stop level and last mark. Lots in the
+# same symbol are netted on fill, so a fill is O(1) whatever the trade
+# history, and marking / stop checks are single vectorized passes over all
+# symbols. snapshot()/restore() turn the whole book into a handful of arrays;
+# an attached journal (journal.FillJournal) is told about every fill.
+import os
+import numpy as np
+import pandas as pd
+
+_ARRAYS = {'qty': np.int64, 'avg_price': np.float64, 'realized': np.float64,
+           'stop': np.float64, 'last': np.float64}
+
+
+class Portfolio:
+    def __init__(self, symbols=(), capacity=64):
+        self.symbols = []
+        self.index = {}   # symbol -> slot
+        self.journal = None
+        self._alloc(max(capacity, len(symbols), 1))
+        for symbol in symbols:
+            self.slot(symbol)
+
+    def _alloc(self, capacity):
+        old = getattr(self, 'qty', None)
+        n = 0 if old is None else len(self.symbols)
+        for name, dtype in _ARRAYS.items():
+            arr = np.zeros(capacity, dtype=dtype)
+            if dtype is np.float64 and name != 'realized':
+                arr[:] = np.nan
+            if n:
+                arr[:n] = getattr(self, name)[:n]
+            setattr(self, name, arr)
+
+    def slot(self, symbol):
+        i = self.index.get(symbol)
+        if i is None:
+            i = len(self.symbols)
+            if i == len(self.qty):
+                self._alloc(2 * i)
+            self.symbols.append(symbol)
+            self.index[symbol] = i
+        return i
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def position(self, symbol):
+        i = self.index.get(symbol)
+        return 0 if i is None else int(self.qty[i])
+
+    # --- Fills
+    def fill(self, symbol, qty, price, stop=None):
+        # Signed fill (+ buy, - sell); returns the PnL it realized
+        i = self.slot(symbol)
+        held = int(self.qty[i])
+        qty = int(qty)
+        self.last[i] = price
+        if qty == 0:
+            return 0.0
+        if self.journal is not None:
+            self.journal.append(symbol, qty, price, stop)
+        pnl = 0.0
+        if held == 0 or (held > 0) == (qty > 0):
+            # Opening or adding: blend the average entry
+            avg = price if held == 0 else (self.avg_price[i] * held + price * qty) / (held + qty)
+            self.avg_price[i] = avg
+            self.qty[i] = held + qty
+            if stop is not None:
+                self.stop[i] = stop
+            return pnl
+        # Reducing, closing or flipping
+        closed = min(abs(qty), abs(held))
+        pnl = closed * (price - self.avg_price[i]) * (1 if held > 0 else -1)
+        self.realized[i] += pnl
+        self.qty[i] = held + qty
+        if self.qty[i] == 0:
+            self.avg_price[i] = np.nan
+            self.stop[i] = np.nan
+        elif (self.qty[i] > 0) != (held > 0):
+            # Flipped: the remainder is a new position at this price
+            self.avg_price[i] = price
+            self.stop[i] = np.nan if stop is None else stop
+        return pnl
+
+    def close(self, symbol, price):
+        return self.fill(symbol, -self.position(symbol), price)
+
+    # --- Marking & stops (prices: dict symbol -> price, or an array aligned with self.symbols)
+    def mark(self, prices):
+        n = len(self.symbols)
+        if isinstance(prices, dict):
+            for symbol, price in prices.items():
+                self.last[self.slot(symbol)] = price
+        else:
+            self.last[:n] = prices
+        return self.unrealized()
+
+    def unrealized(self):
+        # Per-symbol open PnL at the last marks (0 when flat or never marked)
+        n = len(self.symbols)
+        qty = self.qty[:n]
+        pnl = qty * (self.last[:n] - self.avg_price[:n])
+        return np.where(qty != 0, np.nan_to_num(pnl), 0.0)
+
+    def realized_pnl(self):
+        return float(self.realized[:len(self.symbols)].sum())
+
+    def total_pnl(self):
+        return self.realized_pnl() + float(self.unrealized().sum())
+
+    def triggered(self):
+        # Slots whose last mark crossed the stop (long: at/below, short: at/above)
+        n = len(self.symbols)
+        qty, last, stop = self.qty[:n], self.last[:n], self.stop[:n]
+        hit = ((qty > 0) & (last <= stop)) | ((qty < 0) & (last >= stop))
+        return np.flatnonzero(hit)
+
+    def stop_out(self):
+        # Close every triggered position at its last mark; returns [(symbol, qty closed, pnl)]
+        out = []
+        for i in self.triggered():
+            symbol, qty = self.symbols[i], int(self.qty[i])
+            out.append((symbol, -qty, self.fill(symbol, -qty, self.last[i])))
+        return out
+
+    # --- Snapshot / restore
+    def snapshot(self):
+        n = len(self.symbols)
+        snap = {name: getattr(self, name)[:n].copy() for name in _ARRAYS}
+        snap['symbols'] = np.array(self.symbols, dtype=str)
+        return snap
+
+    @classmethod
+    def restore(cls, snap):
+        book = cls(list(snap['symbols']))
+        n = len(book)
+        for name in _ARRAYS:
+            getattr(book, name)[:n] = snap[name]
+        return book
+
+    def save(self, path):
+        # Written next to the target and renamed over it, so a reader never sees half a file
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, **self.snapshot())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls.restore({k: f[k] for k in f.files})
+
+    def frame(self):
+        # Open positions as a DataFrame (for printing / dashboards)
+        n = len(self.symbols)
+        df = pd.DataFrame({name: getattr(self, name)[:n] for name in _ARRAYS}, index=self.symbols)
+        df['unrealized'] = self.unrealized()
+        return df[df['qty'] != 0]
@@ -0,0 +1,63 @@
+# Client for predict_server.py (stdlib only, so callers don't import sklearn)
+#
+# The server address comes from PREDICT_SERVER: a URL (default
+# http://127.0.0.1:8765) or unix:/path/to.sock. Every failure to get an
+# answer (server not running, timeout, HTTP error) raises OSError, so callers
+# can fall back to loading the model themselves.
+import os
+import json
+import socket
+import http.client
+from urllib.parse import urlsplit
+
+DEFAULT_SERVER = 'http://127.0.0.1:8765'
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def _connect(server, timeout):
+    if server.startswith('unix:'):
+        return _UnixConnection(server[len('unix:'):], timeout)
+    url = urlsplit(server)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+
+def request(method, path, body=None, server=None, timeout=1.0):
+    conn = _connect(server or os.environ.get('PREDICT_SERVER', DEFAULT_SERVER), timeout)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={'Content-Type': 'application/json', 'Connection': 'close'})
+        response = conn.getresponse()
+        data = json.loads(response.read() or b'{}')
+    except (http.client.HTTPException, ValueError) as e:
+        raise OSError(f"prediction server: {e}") from e
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise OSError(f"prediction server: {response.status} {data.get('error', '')}")
+    return data
+
+
+def predict(symbol=None, row=None, features=None, bar=None, server=None, timeout=1.0):
+    # {'p_up', 'proba', 'class', 'price', 'version', 'cached', 'ms', ...}; see predict_server.py
+    body = {'symbol': symbol}
+    if row is not None:
+        body['row'] = [float(v) for v in row]
+    if features is not None:
+        body['features'] = features
+    if bar is not None:
+        body['bar'] = str(bar)
+    return request('POST', '/predict', body, server, timeout)
+
+
+def stats(server=None, timeout=1.0):
+    return request('GET', '/stats', server=server, timeout=timeout)
@@ -0,0 +1,226 @@
+# Local prediction server
+#
+# Keeps the registry model loaded and warm in one long-lived process, so a
+# one-shot script like infer_and_trade.py pays a localhost round trip instead
+# of importing sklearn and unpickling the forest on every run. The server
+# speaks a minimal HTTP/1.1 with JSON bodies (keep-alive supported), on
+# 127.0.0.1 or a Unix socket:
+#
+#   POST /predict  {"symbol": "AAPL"}                 latest row from the feature store
+#                  {"row": [...], "bar": "..."}      full row in FEATURE_COLUMNS order
+#                  {"features": {...}, "bar": "..."} named features, missing ones NaN
+#   GET  /stats    latency percentiles, batch and cache counters
+#   GET  /health   model version
+#
+# Requests arriving within BATCH_WINDOW are answered by a single
+# predict_proba call (async_trader.InferenceBatcher), and identical feature
+# rows within the same bar are answered from a memo, including requests that
+# arrive while the first one is still being computed. P(up) is calibrated
+# with the version's calibration curve when it has one. The model is
+# hot-swapped by the registry's ModelWatcher; memo keys carry the version.
+#
+# Usage: python scripts/predict_server.py [--port 8765 | --unix /tmp/predict.sock]
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from async_trader import InferenceBatcher
+from feature_store import load_latest
+from indicators import FEATURE_COLUMNS
+from latency import LatencyRecorder
+from registry import ModelWatcher
+
+# --- Config ---
+HOST = '127.0.0.1'
+PORT = 8765
+LOG_FOLDER = 'trade_logs'
+BATCH_WINDOW = 0.002      # how long the batcher waits for more requests
+MEMO_SIZE = 10_000        # memoized (version, bar, row) results
+BAR_SECONDS = 60          # bar of a request that doesn't name one
+
+_INDEX = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    pass
+
+
+def _latest_row(symbol):
+    # Newest feature row of a symbol, None if it has no features
+    try:
+        return load_latest(symbol, 1, columns=FEATURE_COLUMNS)
+    except (FileNotFoundError, KeyError):
+        return None
+
+
+class PredictServer:
+    def __init__(self, window=BATCH_WINDOW, memo_size=MEMO_SIZE):
+        self.watcher = ModelWatcher()
+        self.model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model')
+        self.io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='io')
+        self.batcher = InferenceBatcher(self.watcher, self.model_executor, window=window)
+        self.metrics = LatencyRecorder('predict_server', LOG_FOLDER)
+        self.memo = OrderedDict()   # (version, bar, row bytes) -> future of P(up)
+        self.memo_size = memo_size
+        self.hits = 0
+        self.misses = 0
+
+    # --- Requests
+    async def row_for(self, request):
+        # (symbol, bar, row) of a /predict body; bad input raises RequestError (400)
+        if not isinstance(request, dict):
+            raise RequestError("body must be a JSON object")
+        symbol = request.get('symbol')
+        if symbol is not None and (not isinstance(symbol, str) or not symbol or '/' in symbol or symbol[0] == '.'):
+            raise RequestError(f"invalid symbol {symbol!r}")
+        if 'row' in request:
+            try:
+                row = np.asarray(request['row'], dtype=np.float64)
+            except (TypeError, ValueError):
+                raise RequestError("row must be a list of numbers")
+            if row.shape != (len(FEATURE_COLUMNS),):
+                raise RequestError(f"row needs {len(FEATURE_COLUMNS)} values in FEATURE_COLUMNS order")
+        elif 'features' in request:
+            if not isinstance(request['features'], dict):
+                raise RequestError("features must be an object of name: value")
+            row = np.full(len(FEATURE_COLUMNS), np.nan)
+            for name, value in request['features'].items():
+                if name not in _INDEX:
+                    raise RequestError(f"unknown feature {name!r}")
+                try:
+                    row[_INDEX[name]] = float(value)
+                except (TypeError, ValueError):
+                    raise RequestError(f"feature {name!r} is not a number: {value!r}")
+        elif symbol:
+            with self.metrics.span('load_row', symbol):
+                df = await asyncio.get_running_loop().run_in_executor(self.io_executor, _latest_row, symbol)
+            if df is None or df.empty:
+                raise RequestError(f"no features for {symbol}")
+            return symbol, df.index[-1].isoformat(), df.to_numpy(dtype=np.float64)[0]
+        else:
+            raise RequestError("need one of symbol, row or features")
+        return symbol, request.get('bar', int(time.time() // BAR_SECONDS)), row
+
+    async def predict(self, request):
+        symbol, bar, row = await self.row_for(request)
+        model = self.watcher.active
+        key = (model.version, str(bar), row.tobytes())
+        future = self.memo.get(key)
+        cached = future is not None
+        if cached:
+            self.hits += 1
+            self.memo.move_to_end(key)
+        else:
+            self.misses += 1
+            future = self.memo[key] = asyncio.ensure_future(self.batcher.predict_up(row))
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        try:
+            with self.metrics.span('cache_hit' if cached else 'predict', symbol or '*'):
+                p_up = float(await asyncio.shield(future))
+        except Exception:
+            self.memo.pop(key, None)   # don't memoize failures
+            raise
+        proba = [0.0] * len(model.classes_)
+        proba[model.up_idx] = p_up
+        proba[1 - model.up_idx] = 1 - p_up
+        return {'symbol': symbol, 'bar': bar, 'price': float(row[0]), 'p_up': p_up, 'proba': proba,
+                'class': model.classes_[int(np.argmax(proba))].item(),
+                'version': model.version, 'cached': cached}
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'version': self.watcher.version,
+                'batches': {'count': self.batcher.batches, 'rows': self.batcher.rows,
+                            'mean_size': self.batcher.rows / self.batcher.batches if self.batcher.batches else None},
+                'memo': {'size': len(self.memo), 'hits': self.hits, 'misses': self.misses,
+                         'hit_rate': self.hits / lookups if lookups else None},
+                'latency': self.metrics.snapshot()['stages']}
+
+    async def route(self, method, path, body):
+        if method == 'POST' and path == '/predict':
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError as e:
+                raise RequestError(f"invalid JSON: {e}")
+            return 200, await self.predict(request)
+        if method == 'GET' and path == '/stats':
+            return 200, self.stats()
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'version': self.watcher.version}
+        return 404, {'error': f"no route {method} {path}"}
+
+    # --- HTTP
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, path, _ = line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while (header := await reader.readline()).strip():
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length') or 0))
+                t0 = time.perf_counter_ns()
+                try:
+                    status, payload = await self.route(method, path.split('?', 1)[0], body)
+                except RequestError as e:
+                    status, payload = 400, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                    self.metrics.error('request')
+                ms = (time.perf_counter_ns() - t0) / 1e6
+                self.metrics.record('request', ms)
+                if status == 200 and path.startswith('/predict'):
+                    payload['ms'] = ms
+                data = json.dumps(payload, default=float).encode()
+                close = headers.get('connection', '').lower() == 'close'
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, unix=None):
+        batcher = asyncio.ensure_future(self.batcher.run())
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, path=unix)
+            where = unix
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            where = f"http://{host}:{port}"
+        print(f"=== {datetime.now()} === serving model {self.watcher.version} on {where}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.metrics.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local prediction server")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--window', type=float, default=BATCH_WINDOW, help="micro-batch window (seconds)")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(PredictServer(window=args.window).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("\n🛑 Prediction server stopped")
@@ -0,0 +1,319 @@
+# Versioned model registry + hot-swap watcher for the live loops
+#
+# Layout: models/registry/{name}/{version}/model.pkl (+ model.npz flat forest
+# when the model is a RandomForest) and meta.json (feature list, classes,
+# metrics, ...); models/registry/{name}/CURRENT holds the live version.
+# Versions are written to a temp dir and renamed into place, and CURRENT is
+# replaced atomically, so a reader always sees a complete version.
+#
+# A loaded version is a BoundModel: the model plus its feature schema compiled
+# to an index map into indicators.FEATURE_COLUMNS, so the live scripts pass the
+# IndicatorEngine's float64 row(s) straight in and the model's columns are one
+# np.take away (no per-tick DataFrame). Binding checks the schema against the
+# model itself, so train and serve can't silently disagree on columns. A
+# version may carry a calibration curve (fitted on out-of-fold predictions
+# and only kept if it improved the holdout Brier score); the bound model maps
+# P(up) through it unless called with calibrated=False.
+#
+# Until a version is published (train_model.py --publish), load() falls back
+# to the plain model file train_model.py saves next to the registry
+# (models/price_direction_rf.pkl), bound to the default MODEL_FEATURES, under
+# the version name 'unregistered'.
+#
+# ModelWatcher polls CURRENT from a background thread; when it changes, the
+# new version is loaded, bound and warmed off the hot path, then published as
+# one BoundModel. A live loop reads watcher.active once per tick, so every
+# tick runs entirely on one version.
+#
+# Usage: python scripts/registry.py publish models/price_direction_rf.pkl --features Close Volume ...
+#        python scripts/registry.py list | promote VERSION
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import warnings
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from forest import export_forest, load_model
+from indicators import FEATURE_COLUMNS, MODEL_FEATURES
+
+REGISTRY_ROOT = os.path.join('models', 'registry')
+DEFAULT_NAME = 'price_direction'
+CURRENT_FILE = 'CURRENT'
+UNREGISTERED = 'unregistered'
+MIN_CALIBRATION_BIN = 50   # rows per bin (isotonic) / minimum rows (sigmoid) of a calibration fit
+# Model file (next to the registry root) used while a name has no published version
+FALLBACK_FILES = {DEFAULT_NAME: 'price_direction_rf.pkl'}
+
+# Models fitted on DataFrames warn when given the plain arrays BoundModel
+# feeds them; columns are matched by the bound schema instead. Installed once
+# here: warnings.catch_warnings() swaps process-wide state and isn't safe with
+# the watcher, the main loop and the executors predicting concurrently.
+warnings.filterwarnings('ignore', message='X does not have valid feature names', module='sklearn')
+
+
+def _model_dir(name, root):
+    return os.path.join(root, name)
+
+
+def versions(name=DEFAULT_NAME, root=REGISTRY_ROOT):
+    path = _model_dir(name, root)
+    if not os.path.isdir(path):
+        return []
+    # Only finished versions: vNNNN.tmp dirs of an interrupted publish already hold a meta.json
+    return sorted(v for v in os.listdir(path)
+                  if re.fullmatch(r'v\d+', v) and os.path.exists(os.path.join(path, v, 'meta.json')))
+
+
+def current_version(name=DEFAULT_NAME, root=REGISTRY_ROOT):
+    try:
+        with open(os.path.join(_model_dir(name, root), CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def promote(version, name=DEFAULT_NAME, root=REGISTRY_ROOT):
+    # Point CURRENT at an existing version (also used for rollbacks)
+    if version not in versions(name, root):
+        raise KeyError(f"{name}: no version {version}")
+    path = os.path.join(_model_dir(name, root), CURRENT_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        f.write(version)
+    os.replace(f"{path}.tmp", path)
+
+
+def _logit(p, eps=1e-6):
+    p = np.clip(p, eps, 1 - eps)
+    return np.log(p / (1 - p))
+
+
+def fit_calibration(p_up, y, method='sigmoid', min_bin=MIN_CALIBRATION_BIN):
+    """Calibration curve for BoundModel.calibrate as {'x', 'y'} knots, or None.
+
+    p_up must be out-of-sample predictions (a calibration split or
+    out-of-fold), never the rows the curve is judged on. 'sigmoid' is Platt
+    scaling on the logit of p_up, sampled on a 0.01 grid; 'isotonic' fits a
+    non-decreasing step curve to quantile bins of at least min_bin rows.
+    None when there are too few rows or the fit isn't increasing in p_up.
+    """
+    p_up = np.asarray(p_up, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if method == 'sigmoid':
+        from sklearn.linear_model import LogisticRegression
+
+        if len(p_up) < min_bin or len(np.unique(y)) < 2:
+            return None
+        lr = LogisticRegression(C=1e4).fit(_logit(p_up)[:, None], y)
+        if lr.coef_[0, 0] <= 0:
+            return None
+        x = np.linspace(0.0, 1.0, 101)
+        return {'x': x.tolist(), 'y': lr.predict_proba(_logit(x)[:, None])[:, 1].tolist()}
+    if method == 'isotonic':
+        from sklearn.isotonic import IsotonicRegression
+
+        bins = len(p_up) // min_bin
+        if bins < 2:
+            return None
+        chunks = np.array_split(np.argsort(p_up, kind='stable'), bins)
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+        iso.fit([p_up[c].mean() for c in chunks], [y[c].mean() for c in chunks], sample_weight=[len(c) for c in chunks])
+        if iso.y_thresholds_[-1] <= iso.y_thresholds_[0]:
+            return None
+        return {'x': iso.X_thresholds_.tolist(), 'y': iso.y_thresholds_.tolist()}
+    raise ValueError(f"unknown calibration method {method!r}")
+
+
+def apply_calibration(p_up, calibration):
+    return np.interp(p_up, calibration['x'], calibration['y']) if calibration else np.asarray(p_up)
+
+
+def publish(model, features, name=DEFAULT_NAME, metrics=None, make_current=True, root=REGISTRY_ROOT,
+            calibration=None):
+    # Store a fitted model as the next version; returns the version string
+    import joblib
+
+    existing = versions(name, root)
+    version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+    final_dir = os.path.join(_model_dir(name, root), version)
+    tmp_dir = final_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    joblib.dump(model, os.path.join(tmp_dir, 'model.pkl'))
+    if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+        export_forest(model, os.path.join(tmp_dir, 'model.npz'), features)
+    meta = {
+        'name': name,
+        'version': version,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'model_type': type(model).__name__,
+        'features': list(features),
+        'feature_index': [FEATURE_COLUMNS.index(f) for f in features],
+        'classes': np.asarray(model.classes_).tolist(),
+        'metrics': metrics or {},
+    }
+    if calibration:
+        meta['calibration'] = calibration
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_dir, final_dir)
+
+    if make_current:
+        promote(version, name, root)
+    return version
+
+
+class BoundModel:
+    """A model bound to its feature schema.
+
+    Inputs are rows in FEATURE_COLUMNS order (IndicatorEngine.row, or a 2-D
+    stack of them); select() takes the model's columns with a precompiled
+    index array and predict_proba() feeds the result to the model as a plain
+    contiguous float array, then calibrates P(up) if the version has a
+    calibration curve (calibrated=False gives the model's own probabilities).
+    """
+
+    def __init__(self, model, meta):
+        features = list(meta['features'])
+        unknown = [f for f in features if f not in FEATURE_COLUMNS]
+        if unknown:
+            raise KeyError(f"{meta.get('version')}: features not produced by the engine: {unknown}")
+        trained = getattr(model, 'feature_names_in_', None)
+        if trained is not None and list(trained) != features:
+            raise ValueError(f"{meta.get('version')}: model was trained on {list(trained)}, schema says {features}")
+        if getattr(model, 'n_features_in_', len(features)) != len(features):
+            raise ValueError(f"{meta.get('version')}: model expects {model.n_features_in_} features, schema has {len(features)}")
+        self.model = model
+        self.meta = meta
+        self.features = features
+        index = [FEATURE_COLUMNS.index(f) for f in features]
+        if meta.get('feature_index') is not None and list(meta['feature_index']) != index:
+            raise ValueError(f"{meta.get('version')}: feature_index {meta['feature_index']} doesn't match "
+                             f"the features' positions in FEATURE_COLUMNS {index}")
+        self.index = np.asarray(index, dtype=np.intp)
+        self.classes_ = np.asarray(model.classes_)
+        self.up_idx = list(self.classes_).index(1)
+        self.version = meta.get('version')
+        knots = meta.get('calibration')
+        self.calibration = (np.asarray(knots['x']), np.asarray(knots['y'])) if knots else None
+
+    def select(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        return np.take(rows, self.index, axis=rows.ndim - 1)
+
+    def calibrate(self, p_up):
+        return np.interp(p_up, *self.calibration) if self.calibration is not None else p_up
+
+    def predict_proba(self, rows, calibrated=True):
+        X = self.select(rows)
+        proba = self.model.predict_proba(X if X.ndim == 2 else X[None, :])
+        if calibrated and self.calibration is not None and proba.shape[1] == 2:
+            proba[:, self.up_idx] = self.calibrate(proba[:, self.up_idx])
+            proba[:, 1 - self.up_idx] = 1 - proba[:, self.up_idx]
+        return proba
+
+
+def load(name=DEFAULT_NAME, version=None, root=REGISTRY_ROOT):
+    # BoundModel for a version, the current one by default; the flat forest is preferred
+    version = version or current_version(name, root)
+    if version is None:
+        return _load_unregistered(name, root)
+    path = os.path.join(_model_dir(name, root), version)
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    return BoundModel(load_model(os.path.join(path, 'model.pkl')), meta)
+
+
+def _load_unregistered(name, root):
+    # Nothing published yet: the model train_model.py saves, with the default features
+    path = os.path.join(os.path.dirname(root), FALLBACK_FILES.get(name, f"{name}.pkl"))
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No current version of '{name}' in {root}/ and no {path}: "
+                                f"run train_model.py --publish or registry.py publish")
+    print(f"⚠️ No published version of '{name}', using {path} (train_model.py --publish registers one)")
+    meta = {'name': name, 'version': UNREGISTERED, 'features': list(MODEL_FEATURES)}
+    return BoundModel(load_model(path), meta)
+
+
+def warm(bound, batch_rows=(1, 8)):
+    # Run predict_proba a few times so the first live tick isn't the slow one
+    for rows in batch_rows:
+        bound.predict_proba(np.zeros((rows, len(FEATURE_COLUMNS))))
+
+
+class ModelWatcher:
+    def __init__(self, name=DEFAULT_NAME, poll_seconds=5.0, root=REGISTRY_ROOT, on_swap=None):
+        self.name = name
+        self.root = root
+        self.poll_seconds = poll_seconds
+        self.on_swap = on_swap
+        self.active = load(name, root=root)   # BoundModel, replaced as a whole; read it once per tick
+        warm(self.active)
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"model-watch-{name}", daemon=True)
+        self.thread.start()
+
+    @property
+    def version(self):
+        return self.active.version
+
+    def check(self):
+        # Load + warm a new CURRENT version if there is one; returns True when swapped
+        version = current_version(self.name, self.root)
+        if version is None or version == self.version:
+            return False
+        t0 = time.perf_counter()
+        bound = load(self.name, version, self.root)
+        warm(bound)
+        old = self.version
+        self.active = bound
+        print(f"🔁 Model {self.name} {old} -> {version} (loaded & warmed in {time.perf_counter() - t0:.2f}s)")
+        if self.on_swap:
+            self.on_swap(bound)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep serving the current model; retry on the next poll
+                print(f"⚠️ Model reload failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Model registry")
+    parser.add_argument('--name', default=DEFAULT_NAME)
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_pub = sub.add_parser('publish', help="register a fitted model pickle as a new version")
+    p_pub.add_argument('path')
+    p_pub.add_argument('--features', nargs='+', required=True)
+    p_pub.add_argument('--no-promote', action='store_true')
+    sub.add_parser('list')
+    p_pro = sub.add_parser('promote', help="make VERSION current (deploy / roll back)")
+    p_pro.add_argument('version')
+    args = parser.parse_args()
+
+    if args.cmd == 'publish':
+        import joblib
+        version = publish(joblib.load(args.path), args.features, args.name, make_current=not args.no_promote)
+        print(f"✅ Published {args.name} {version}")
+    elif args.cmd == 'promote':
+        promote(args.version, args.name)
+        print(f"✅ {args.name} CURRENT -> {args.version}")
+    else:
+        current = current_version(args.name)
+        for v in versions(args.name):
+            with open(os.path.join(_model_dir(args.name, REGISTRY_ROOT), v, 'meta.json')) as f:
+                meta = json.load(f)
+            mark = '*' if v == current else ' '
+            print(f"{mark} {v}  {meta['created']}  {meta['model_type']}  {meta['metrics']}")
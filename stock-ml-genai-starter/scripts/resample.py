@@ -0,0 +1,301 @@
+# Multi-timeframe bar aggregation (ticks or 1-minute bars -> 5min/15min/1h ...)
+#
+# Bars are epoch-aligned UTC buckets labelled by their start, with the
+# columns of the 1-minute files plus the mean bid/ask spread and the number
+# of ticks aggregated (BAR_COLUMNS). Tick input (time, bid, ask[, volume])
+# is priced at the mid; without a volume column every tick counts as 1
+# (tick volume).
+#
+# Every timeframe is built from the next lower one that divides it (1h from
+# 15min, 15min from 5min, ...), never from the raw data again, and the
+# results are exactly what a direct aggregation of the raw data gives.
+#
+# Two modes, same bars:
+#   - bulk: resample_chunks() / resample_all() reduce whole arrays with
+#     np.*.reduceat; chunks of any size can be fed, the last (possibly
+#     incomplete) bar of each timeframe is carried into the next chunk.
+#   - streaming: MultiTimeframe.add_tick() / add_bar() update the open bar of
+#     each timeframe in O(1) and return the bars completed by that update.
+#
+# Usage: python scripts/resample.py EURUSD --ticks data/eurusd_sample.csv
+#        python scripts/resample.py AAPL MSFT [--timeframes 5min 15min 1h]   (from data/{symbol}_1min.csv)
+import os
+import math
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from indicators import OHLCV_COLUMNS
+
+BAR_COLUMNS = OHLCV_COLUMNS + ['Spread', 'Ticks']
+TIMEFRAMES = {'1min': 60, '5min': 300, '15min': 900, '1h': 3600, '4h': 14400, '1d': 86400}
+DEFAULT_TIMEFRAMES = ('5min', '15min', '1h')
+_NS = 1_000_000_000
+_C, _H, _L, _O, _V, _S, _T = range(len(BAR_COLUMNS))
+
+
+def _plan(timeframes):
+    # Timeframes sorted by length, each with the index of its source (-1 = the input)
+    tfs = sorted(dict.fromkeys(timeframes), key=lambda tf: TIMEFRAMES[tf])
+    plan = []
+    for k, tf in enumerate(tfs):
+        source = -1
+        for j in range(k - 1, -1, -1):
+            if TIMEFRAMES[tf] % TIMEFRAMES[tfs[j]] == 0:
+                source = j
+                break
+        plan.append((tf, source))
+    return plan
+
+
+# --- Bulk (vectorized)
+def _records(df):
+    # (int64 ns timestamps, rows x BAR_COLUMNS float64) from a tick or bar frame
+    index = pd.DatetimeIndex(df.index)
+    index = index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC')
+    t = index.tz_convert(None).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    cols = {c.lower(): c for c in df.columns}
+    out = np.empty((len(df), len(BAR_COLUMNS)))
+    if 'bid' in cols:
+        bid = df[cols['bid']].to_numpy(dtype=np.float64)
+        ask = df[cols['ask']].to_numpy(dtype=np.float64)
+        out[:, _C:_O + 1] = ((bid + ask) / 2)[:, None]
+        out[:, _V] = df[cols['volume']].to_numpy(dtype=np.float64) if 'volume' in cols else 1.0
+        out[:, _S] = ask - bid
+        out[:, _T] = 1.0
+    else:
+        for j, c in enumerate(OHLCV_COLUMNS):
+            out[:, j] = df[c].to_numpy(dtype=np.float64)
+        out[:, _S] = df['Spread'].to_numpy(dtype=np.float64) if 'Spread' in df else np.nan
+        out[:, _T] = df['Ticks'].to_numpy(dtype=np.float64) if 'Ticks' in df else 1.0
+    if len(t) > 1 and (np.diff(t) < 0).any():
+        order = np.argsort(t, kind='stable')
+        t, out = t[order], out[order]
+    return t, out
+
+
+def _reduce(t, x, seconds):
+    # Aggregate sorted records into `seconds` buckets -> (bucket start ns, bars)
+    if not len(t):
+        return t, x
+    ids = t // (seconds * _NS)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(t)] - 1
+    out = np.empty((len(starts), len(BAR_COLUMNS)))
+    out[:, _O] = x[starts, _O]
+    out[:, _C] = x[ends, _C]
+    out[:, _H] = np.maximum.reduceat(x[:, _H], starts)
+    out[:, _L] = np.minimum.reduceat(x[:, _L], starts)
+    out[:, _V] = np.add.reduceat(x[:, _V], starts)
+    out[:, _T] = np.add.reduceat(x[:, _T], starts)
+    # Spread: tick-weighted mean over the records that have one
+    has = ~np.isnan(x[:, _S])
+    weight = np.add.reduceat(np.where(has, x[:, _T], 0.0), starts)
+    total = np.add.reduceat(np.where(has, x[:, _S] * x[:, _T], 0.0), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[:, _S] = np.where(weight > 0, total / weight, np.nan)
+    return ids[starts] * (seconds * _NS), out
+
+
+def _frame(t, x):
+    index = pd.DatetimeIndex(pd.to_datetime(t, unit='ns', utc=True), name='Datetime')
+    return pd.DataFrame(x, index=index, columns=BAR_COLUMNS)
+
+
+def resample_chunks(chunks, timeframes=DEFAULT_TIMEFRAMES):
+    """Bars for several timeframes from an iterable of tick or bar frames (time-ordered).
+
+    Yields {timeframe: DataFrame of completed bars} per chunk and once more
+    at the end for the bars still open. Each timeframe is reduced from the
+    completed bars of its source timeframe in the same chunk.
+    """
+    plan = _plan(timeframes)
+    empty = (np.empty(0, dtype=np.int64), np.empty((0, len(BAR_COLUMNS))))
+    pending = [empty] * len(plan)    # last (maybe incomplete) bar of each timeframe
+    for chunk in chunks:
+        base = _records(chunk)
+        done, out = [], {}
+        for k, (tf, source) in enumerate(plan):
+            t, x = base if source == -1 else done[source]
+            t = np.concatenate((pending[k][0], t))
+            x = np.concatenate((pending[k][1], x))
+            t, x = _reduce(t, x, TIMEFRAMES[tf])
+            pending[k] = (t[-1:], x[-1:])
+            done.append((t[:-1], x[:-1]))
+            out[tf] = _frame(*done[k])
+        yield out
+    # Flush: open bars cascade upwards in timeframe order
+    out, flushed = {}, []
+    for k, (tf, source) in enumerate(plan):
+        t, x = pending[k]
+        if source != -1 and len(flushed[source][0]):
+            t, x = _reduce(np.concatenate((t, flushed[source][0])),
+                           np.concatenate((x, flushed[source][1])), TIMEFRAMES[tf])
+        flushed.append((t, x))
+        out[tf] = _frame(t, x)
+    yield out
+
+
+def resample_all(df, timeframes=DEFAULT_TIMEFRAMES):
+    # {timeframe: bars} for a whole tick or bar frame in memory
+    parts = {tf: [] for tf in timeframes}
+    for out in resample_chunks([df], timeframes):
+        for tf, bars in out.items():
+            parts[tf].append(bars)
+    return {tf: pd.concat(p) for tf, p in parts.items()}
+
+
+# --- Streaming
+def _ns(ts):
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    ts = pd.Timestamp(ts)
+    return (ts.tz_convert('UTC') if ts.tzinfo else ts.tz_localize('UTC')).value
+
+
+class BarAggregator:
+    """The open bar of one timeframe; update() returns the bar it completed, if any.
+
+    A late record (older than the open bar) is folded into the open bar.
+    """
+
+    def __init__(self, timeframe):
+        self.timeframe = timeframe
+        self.width = TIMEFRAMES[timeframe] * _NS
+        self.bucket = None
+        self.bar = None    # [close, high, low, open, volume, spread * ticks, spread ticks, ticks]
+
+    def update(self, ts_ns, close, high, low, open_, volume, spread=math.nan, ticks=1.0):
+        done = self.advance(ts_ns)
+        has = spread == spread
+        if self.bar is None:
+            self.bucket = ts_ns // self.width
+            self.bar = [close, high, low, open_, volume,
+                        spread * ticks if has else 0.0, ticks if has else 0.0, ticks]
+        else:
+            b = self.bar
+            b[0] = close
+            b[1] = high if high > b[1] else b[1]
+            b[2] = low if low < b[2] else b[2]
+            b[4] += volume
+            if has:
+                b[5] += spread * ticks
+                b[6] += ticks
+            b[7] += ticks
+        return done
+
+    def advance(self, ts_ns):
+        # Close the open bar if ts_ns falls in a later bucket
+        if self.bar is not None and ts_ns // self.width > self.bucket:
+            return self.flush()
+        return None
+
+    def current(self):
+        # The open bar as (timestamp, values), or None
+        if self.bar is None:
+            return None
+        c, h, l, o, v, s, n, t = self.bar
+        values = np.array([c, h, l, o, v, s / n if n else np.nan, t])
+        return pd.Timestamp(self.bucket * self.width, unit='ns', tz='UTC'), values
+
+    def flush(self):
+        bar = self.current()
+        self.bar = None
+        return bar
+
+
+class MultiTimeframe:
+    """Streaming counterpart of resample_chunks for one symbol.
+
+    add_tick() / add_bar() return {timeframe: [(timestamp, values), ...]} for
+    the bars completed by that record (values in BAR_COLUMNS order, so
+    values[:5] is what IndicatorEngine.update takes).
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES):
+        self.plan = _plan(timeframes)
+        self.levels = [BarAggregator(tf) for tf, _ in self.plan]
+
+    def add_tick(self, ts, bid, ask, volume=1.0):
+        mid = (bid + ask) / 2
+        return self._push(_ns(ts), (mid, mid, mid, mid, volume, ask - bid, 1.0))
+
+    def add_bar(self, ts, close, high, low, open_, volume, spread=math.nan, ticks=1.0):
+        return self._push(_ns(ts), (close, high, low, open_, volume, spread, ticks))
+
+    def _push(self, ts_ns, values):
+        completed = []
+        for level, (_, source) in zip(self.levels, self.plan):
+            done = []
+            if source == -1:
+                bar = level.update(ts_ns, *values)
+                if bar is not None:
+                    done.append(bar)
+            else:
+                for ts, v in completed[source]:
+                    bar = level.update(ts.value, *v)
+                    if bar is not None:
+                        done.append(bar)
+                bar = level.advance(ts_ns)
+                if bar is not None:
+                    done.append(bar)
+            completed.append(done)
+        return {tf: done for (tf, _), done in zip(self.plan, completed) if done}
+
+    def flush(self):
+        # Close every open bar (end of data), cascading them upwards
+        completed = []
+        for level, (_, source) in zip(self.levels, self.plan):
+            done = []
+            if source != -1:
+                for ts, v in completed[source]:
+                    bar = level.update(ts.value, *v)
+                    if bar is not None:
+                        done.append(bar)
+            bar = level.flush()
+            if bar is not None:
+                done.append(bar)
+            completed.append(done)
+        return {tf: done for (tf, _), done in zip(self.plan, completed) if done}
+
+
+# --- CLI: one pass over a tick file or a 1-minute bar file
+def _read_ticks(path, chunk_rows):
+    for chunk in pd.read_csv(path, index_col=0, chunksize=chunk_rows):
+        chunk.index = pd.to_datetime(chunk.index, format='ISO8601', utc=True)
+        yield chunk
+
+
+if __name__ == '__main__':
+    from feature_store import read_raw_csv
+
+    parser = argparse.ArgumentParser(description="Aggregate ticks or 1-minute bars into higher timeframes")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--ticks', default=None, help="tick CSV (time, bid, ask[, volume]) for a single symbol")
+    parser.add_argument('--timeframes', nargs='+', default=list(DEFAULT_TIMEFRAMES), choices=list(TIMEFRAMES))
+    parser.add_argument('--data-folder', default='data')
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if args.ticks and len(args.symbols) != 1:
+        parser.error("--ticks takes exactly one symbol")
+    for symbol in args.symbols:
+        if args.ticks:
+            chunks = _read_ticks(args.ticks, args.chunk_rows)
+            timeframes = list(dict.fromkeys(['1min'] + args.timeframes))
+        else:
+            # 1-minute bars are already the source: don't rewrite them
+            chunks = [read_raw_csv(os.path.join(args.data_folder, f"{symbol}_1min.csv"))]
+            timeframes = [tf for tf in args.timeframes if tf != '1min']
+        written = dict.fromkeys(timeframes, 0)
+        for out in resample_chunks(chunks, timeframes):
+            for tf, bars in out.items():
+                path = os.path.join(args.data_folder, f"{symbol}_{tf}.csv")
+                first = written[tf] == 0
+                if bars.empty and not first:
+                    continue
+                bars.to_csv(path, mode='w' if first else 'a', header=first)
+                written[tf] += len(bars)
+        for tf, n in written.items():
+            print(f"✅ {symbol} {tf}: {n} bars -> {args.data_folder}/{symbol}_{tf}.csv")
@@ -0,0 +1,36 @@
+# Trading rules shared by the live scripts and the backtester
+import numpy as np
+
+capital = 10_000          # total capital
+risk_per_trade = 0.01     # risk 1% per trade
+stop_loss_pct = 0.005     # stop loss 0.5%
+threshold = 0.6           # min class probability to act
+
+
+def position_size(price, capital=capital, risk_per_trade=risk_per_trade, stop_loss_pct=stop_loss_pct):
+    # Shares such that hitting the stop loses `risk_per_trade` of capital (at least 1);
+    # works on a single price or on a whole array of prices
+    dollar_risk = capital * risk_per_trade
+    stop_loss_amount = np.asarray(price, dtype=np.float64) * stop_loss_pct
+    qty = np.maximum((dollar_risk / stop_loss_amount).astype(np.int64), 1)
+    return int(qty) if qty.ndim == 0 else qty
+
+
+def signals(proba_up, threshold=threshold):
+    # +1 = BUY, -1 = SELL, 0 = HOLD for an array of P(up) values
+    proba_up = np.asarray(proba_up, dtype=np.float64)
+    side = np.zeros(proba_up.shape, dtype=np.int8)
+    side[proba_up > threshold] = 1
+    side[(1 - proba_up) > threshold] = -1
+    return side
+
+
+def decide(current_price, proba_up, threshold=threshold, capital=capital,
+           risk_per_trade=risk_per_trade, stop_loss_pct=stop_loss_pct):
+    # Scalar version used once per tick: returns (action, qty, stop_price)
+    qty = position_size(current_price, capital, risk_per_trade, stop_loss_pct)
+    if proba_up > threshold:
+        return "BUY", qty, current_price * (1 - stop_loss_pct)
+    if (1 - proba_up) > threshold:
+        return "SELL", qty, current_price * (1 + stop_loss_pct)
+    return "HOLD", qty, None
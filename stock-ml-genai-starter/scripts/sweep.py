@@ -0,0 +1,219 @@
+# Parallel parameter sweep over strategy thresholds and indicator windows
+#
+# OHLCV for all symbols is loaded once into a shared-memory block; pool
+# workers attach to it by name, so no price data is pickled per task. One
+# task = one set of indicator windows plus every rule combination
+# (threshold / stop / risk) for it, so the features and model probabilities
+# are computed once and reused by all the cheap backtests. Indicator columns
+# are also cached per (symbol, indicator, window) inside each worker.
+#
+# The model is retrained for every window set: a forest trained on SMA_20
+# would otherwise score SMA_30 columns it has never seen. Each task fits the
+# train_model.py forest on the first 1 - HOLDOUT of every symbol's rows
+# (computed with its windows) and backtests only the rest, so all configs
+# are ranked out of sample.
+#
+# Usage: python scripts/sweep.py [--samples N] [--workers N] [--seed N]
+import os
+import sys
+import time
+import argparse
+import itertools
+from functools import lru_cache
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from sklearn.ensemble import RandomForestClassifier
+
+import indicators
+import training
+from backtest import run_backtest
+
+symbols = ['AAPL', 'AMZN', 'GOOGL', 'MSFT', 'SPY', 'EURUSD=X', 'GBPUSD=X']
+out_file = 'backtests/sweep_results.csv'
+
+# --- Parameter grid
+window_grid = {
+    'sma_fast': [10, 20, 30],
+    'sma_slow': [50, 100],
+    'rsi_window': [7, 14, 21],
+    'macd': [(12, 26, 9), (8, 21, 5)],
+}
+rule_grid = {
+    'threshold': [0.55, 0.6, 0.65, 0.7],
+    'stop_loss_pct': [0.0025, 0.005, 0.01],
+    'risk_per_trade': [0.005, 0.01, 0.02],
+}
+
+OHLCV = ['Close', 'High', 'Low', 'Open', 'Volume']
+HOLDOUT = 0.2   # last fraction of each symbol's rows: backtested, never trained on
+MODEL_PARAMS = {'n_estimators': 100, 'random_state': 42, 'n_jobs': 1}   # train_model.py's forest, one core per worker
+
+# Set in each worker by _init_worker
+_prices = None      # (5, total_rows) view into shared memory
+_offsets = None     # symbol -> (start, stop) rows
+_shm = None
+
+
+def load_ohlcv():
+    frames = {}
+    for symbol in symbols:
+        df = pd.read_csv(f"data/{symbol}_1min.csv", index_col=0, parse_dates=True)
+        for col in OHLCV:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        frames[symbol] = df.dropna(subset=['Close'])
+    return frames
+
+
+def to_shared(frames):
+    # Pack every symbol's OHLCV into one (5, rows) float64 block
+    offsets, start = {}, 0
+    for symbol, df in frames.items():
+        offsets[symbol] = (start, start + len(df))
+        start += len(df)
+    shm = shared_memory.SharedMemory(create=True, size=max(start, 1) * len(OHLCV) * 8)
+    block = np.ndarray((len(OHLCV), start), dtype=np.float64, buffer=shm.buf)
+    for symbol, df in frames.items():
+        a, b = offsets[symbol]
+        block[:, a:b] = df[OHLCV].to_numpy(dtype=np.float64).T
+    return shm, block.shape, offsets
+
+
+def _init_worker(shm_name, shape, offsets):
+    global _prices, _offsets, _shm
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    if sys.version_info < (3, 13):
+        # Attaching registers the block with the resource tracker, which would
+        # unlink it when this worker exits; the parent owns its lifetime.
+        resource_tracker.unregister(_shm._name, 'shared_memory')
+    _prices = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _offsets = offsets
+
+
+def _close(symbol):
+    a, b = _offsets[symbol]
+    return pd.Series(_prices[0, a:b])
+
+
+@lru_cache(maxsize=None)
+def _indicator(symbol, name, params):
+    close = _close(symbol)
+    if name == 'sma':
+        return indicators.sma(close, params).to_numpy()
+    if name == 'rsi':
+        return indicators.rsi(close, params).to_numpy()
+    if name == 'macd':
+        return tuple(s.to_numpy() for s in indicators.macd(close, *params))
+    raise ValueError(name)
+
+
+def _feature_frame(symbol, windows):
+    # Model input slots keep their usual names; the columns use the swept windows
+    a, b = _offsets[symbol]
+    line, sig, hist = _indicator(symbol, 'macd', windows['macd'])
+    return pd.DataFrame({
+        'Close': _prices[0, a:b],
+        'High': _prices[1, a:b],
+        'Low': _prices[2, a:b],
+        'Open': _prices[3, a:b],
+        'Volume': _prices[4, a:b],
+        'SMA_20': _indicator(symbol, 'sma', windows['sma_fast']),
+        'SMA_50': _indicator(symbol, 'sma', windows['sma_slow']),
+        'RSI_14': _indicator(symbol, 'rsi', windows['rsi_window']),
+        'MACD': line,
+        'MACD_signal': sig,
+        'MACD_hist': hist,
+    }).dropna()
+
+
+def evaluate(windows, rules_list):
+    features = indicators.MODEL_FEATURES
+    t0 = time.perf_counter()
+    # Train on the early rows of every symbol, keep the late rows for the backtests
+    train, tests = [], []
+    for symbol in symbols:
+        df = training.add_target(_feature_frame(symbol, windows))
+        cut = int(len(df) * (1 - HOLDOUT))
+        # Drop the training rows whose target looks into the holdout
+        train.append(df.iloc[:max(cut - training.TARGET_HORIZON, 0)])
+        if len(df) - cut >= 2:
+            tests.append(df.iloc[cut:])
+    train = pd.concat(train)
+    if train['target'].nunique() < 2:
+        return []
+    model = RandomForestClassifier(**MODEL_PARAMS).fit(train[features], train['target'])
+    up = list(model.classes_).index(1)
+    per_symbol = [(df, model.predict_proba(df[features])[:, up]) for df in tests]
+
+    rows = []
+    for rules in rules_list:
+        stats = [run_backtest(df, proba, **rules)[1] for df, proba in per_symbol]
+        if not stats:
+            continue
+        rows.append({
+            **windows,
+            **rules,
+            'symbols': len(stats),
+            'mean_return_pct': float(np.mean([s['return_pct'] for s in stats])),
+            'worst_drawdown_pct': float(np.min([s['max_drawdown_pct'] for s in stats])),
+            'mean_hit_rate': float(np.nanmean([s['hit_rate'] for s in stats])),
+            'trades': int(np.sum([s['trades'] for s in stats])),
+            'mean_turnover': float(np.mean([s['turnover'] for s in stats])),
+        })
+    elapsed = time.perf_counter() - t0
+    for row in rows:
+        row['task_seconds'] = elapsed
+    return rows
+
+
+def build_tasks(samples=None, seed=0):
+    window_keys, rule_keys = list(window_grid), list(rule_grid)
+    configs = [(w, r) for w in itertools.product(*window_grid.values())
+               for r in itertools.product(*rule_grid.values())]
+    if samples is not None and samples < len(configs):
+        rng = np.random.default_rng(seed)
+        configs = [configs[i] for i in sorted(rng.choice(len(configs), samples, replace=False))]
+
+    # Group rule variants under their window set: one task per window set
+    tasks = {}
+    for w, r in configs:
+        tasks.setdefault(w, []).append(dict(zip(rule_keys, r)))
+    return [(dict(zip(window_keys, w)), rules) for w, rules in tasks.items()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Parameter sweep over strategy and indicator settings")
+    parser.add_argument('--samples', type=int, default=None, help="random sample of N configs instead of the full grid")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.samples, args.seed)
+    n_configs = sum(len(rules) for _, rules in tasks)
+    print(f"=== Sweeping {n_configs} configs ({len(tasks)} window sets) on {args.workers} workers ===")
+
+    shm, shape, offsets = to_shared(load_ohlcv())
+    t0 = time.perf_counter()
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(shm.name, shape, offsets)) as pool:
+            futures = [pool.submit(evaluate, windows, rules) for windows, rules in tasks]
+            for i, future in enumerate(as_completed(futures), 1):
+                results.extend(future.result())
+                print(f"  {i}/{len(futures)} window sets done", end='\r')
+    finally:
+        shm.close()
+        shm.unlink()
+
+    os.makedirs(os.path.dirname(out_file), exist_ok=True)
+    ranked = (pd.DataFrame(results)
+              .sort_values(['mean_return_pct', 'worst_drawdown_pct'], ascending=[False, False])
+              .reset_index(drop=True))
+    ranked.index += 1
+    ranked.to_csv(out_file, index_label='rank')
+    print(f"\n✅ {len(ranked)} configs in {time.perf_counter() - t0:.1f}s, saved to {out_file}")
+    print(ranked.head(10).to_string())
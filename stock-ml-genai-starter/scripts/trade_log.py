@@ -0,0 +1,99 @@
+# Trade log shared by the live scripts
+#
+# Every script writes the same fixed schema (LOG_COLUMNS, no header) to
+# trade_logs/trades_YYYY-MM-DD.txt, rolling over to trades_YYYY-MM-DD.1.txt,
+# .2.txt ... once a file reaches max_bytes, through the buffered
+# TradeLogWriter (trade_log_writer.py, re-exported here). With binary=True
+# each batch is also appended to trades_YYYY-MM-DD.bin as fixed-width
+# RECORD_DTYPE rows (np.fromfile-able).
+#
+# TradeLogReader is the incremental counterpart used by the dashboard: it
+# remembers how far each file has been parsed and only reads what was
+# appended, keeping running totals and a downsampled cumulative PnL series.
+import io
+import os
+import glob
+import threading
+
+import numpy as np
+import pandas as pd
+
+from decimate import M4Downsampler
+from trade_log_writer import LOG_COLUMNS, TradeLogWriter
+
+RECORD_DTYPE = np.dtype([
+    ("time", "datetime64[us]"), ("symbol", "U12"), ("price", "f8"), ("action", "U4"),
+    ("qty", "i8"), ("stop_price", "f8"), ("pnl", "f8"), ("proba", "f8"),
+])
+
+
+def read_binary_log(path):
+    return np.fromfile(path, dtype=RECORD_DTYPE)
+
+
+def _log_order(path):
+    # (day, rotation part) so trades_D.txt comes before trades_D.1.txt, .2.txt ... .10.txt
+    day, _, part = os.path.basename(path)[len("trades_"):-len(".txt")].partition(".")
+    return day, int(part) if part.isdigit() else 0
+
+
+class TradeLogReader:
+    def __init__(self, folder="trade_logs", width=800, recent=10):
+        self.folder = folder
+        self.offsets = {}        # path -> bytes parsed
+        self.partial = {}        # path -> trailing bytes without a newline yet
+        self.recent_rows = recent
+        self.recent = None       # last `recent` rows, for the table
+        self.count = 0
+        self.cum_pnl = 0.0
+        self.last_pnl = np.nan
+        self.series = M4Downsampler(width)
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        # Parse only bytes appended since the last call; returns the number of new rows
+        with self.lock:
+            added = 0
+            for path in sorted(glob.glob(os.path.join(self.folder, "trades_*.txt")), key=_log_order):
+                chunk = self._read_new(path)
+                if chunk is not None and len(chunk):
+                    self._add(chunk)
+                    added += len(chunk)
+            return added
+
+    def _read_new(self, path):
+        size = os.path.getsize(path)
+        offset = self.offsets.get(path, 0)
+        if size < offset:
+            # File was truncated/replaced: start over on it
+            offset = 0
+            self.partial.pop(path, None)
+        if size == offset:
+            return None
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = self.partial.pop(path, b"") + f.read(size - offset)
+        self.offsets[path] = size
+        complete, _, rest = data.rpartition(b"\n")
+        if rest:
+            self.partial[path] = rest
+        if not complete:
+            return None
+        chunk = pd.read_csv(io.BytesIO(complete), names=LOG_COLUMNS, skipinitialspace=True)
+        chunk["time"] = pd.to_datetime(chunk["time"], format="ISO8601", errors="coerce")
+        return chunk.dropna(subset=["time"])
+
+    def _add(self, chunk):
+        chunk["cum_pnl"] = self.cum_pnl + chunk["pnl"].cumsum()
+        self.cum_pnl += chunk["pnl"].sum()
+        self.count += len(chunk)
+        self.last_pnl = chunk["pnl"].iloc[-1]
+        seconds = chunk["time"].to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+        self.series.add_many(seconds, chunk["cum_pnl"].to_numpy(dtype=np.float64))
+        if self.recent is not None:
+            chunk = pd.concat([self.recent, chunk])
+        self.recent = chunk.iloc[-self.recent_rows:]
+
+    def cum_pnl_series(self):
+        t, v = self.series.points()
+        return pd.Series(v, index=pd.to_datetime(t, unit="s"), name="cum_pnl")
@@ -0,0 +1,113 @@
+# Buffered trade log writer shared by the live scripts
+#
+# log() only puts a tuple on a queue; a background thread batches records and
+# writes them with one open/write per flush. Every script writes the same
+# fixed schema (LOG_COLUMNS, no header) to trade_logs/trades_YYYY-MM-DD.txt,
+# rolling over to trades_YYYY-MM-DD.1.txt, .2.txt ... once a file reaches
+# max_bytes. With binary=True each batch is also appended to
+# trades_YYYY-MM-DD.bin as fixed-width RECORD_DTYPE rows (np.fromfile-able).
+#
+# Stdlib only (numpy is imported for binary=True), so one-shot scripts like
+# infer_and_trade.py don't pay for pandas; trade_log.py re-exports it next to
+# the reader.
+import os
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+LOG_COLUMNS = ["time", "symbol", "price", "action", "qty", "stop_price", "pnl", "proba"]
+
+_STOP = object()
+
+
+def _fmt(value):
+    if value is None or value != value:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.10g}"
+    return str(value)
+
+
+class TradeLogWriter:
+    def __init__(self, folder="trade_logs", flush_interval=1.0, max_batch=1000,
+                 max_bytes=50 * 1024 * 1024, binary=False):
+        self.folder = folder
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self.binary = binary
+        self.queue = queue.Queue()
+        self.parts = {}   # day -> current rotation number
+        os.makedirs(folder, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="trade-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def log(self, symbol, price, action, qty, stop_price=None, pnl=None, proba=None, time=None):
+        self.queue.put((time or datetime.now(), symbol, price, action, qty, stop_price, pnl, proba))
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def path_for(self, day):
+        part = self.parts.get(day, 0)
+        suffix = f".{part}" if part else ""
+        return os.path.join(self.folder, f"trades_{day}{suffix}.txt")
+
+    # --- Background thread
+    def _run(self):
+        batch, stop = [], False
+        while not stop:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+                    # Drain whatever else is already queued before writing
+                    while len(batch) < self.max_batch:
+                        item = self.queue.get_nowait()
+                        if item is _STOP:
+                            stop = True
+                            break
+                        batch.append(item)
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    print(f"⚠️ Trade log write failed: {e}")
+                batch = []
+
+    def _flush(self, records):
+        by_day = {}
+        for rec in records:
+            by_day.setdefault(rec[0].strftime("%Y-%m-%d"), []).append(rec)
+        for day, recs in by_day.items():
+            path = self.path_for(day)
+            while os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+                self.parts[day] = self.parts.get(day, 0) + 1
+                path = self.path_for(day)
+            lines = "".join(
+                ",".join([rec[0].isoformat(sep=" ")] + [_fmt(v) for v in rec[1:]]) + "\n" for rec in recs
+            )
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            if self.binary:
+                self._write_binary(day, recs)
+
+    def _write_binary(self, day, recs):
+        import numpy as np
+        from trade_log import RECORD_DTYPE
+        arr = np.array(
+            [(np.datetime64(r[0], "us"), r[1], r[2], r[3], r[4],
+              np.nan if r[5] is None else r[5], np.nan if r[6] is None else r[6],
+              np.nan if r[7] is None else r[7]) for r in recs],
+            dtype=RECORD_DTYPE,
+        )
+        with open(os.path.join(self.folder, f"trades_{day}.bin"), "ab") as f:
+            arr.tofile(f)
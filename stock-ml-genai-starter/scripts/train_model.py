@@ -1,51 +1,123 @@
 # Build & train ML model
+#
+# Default: RandomForest on all feature rows in memory (exported as a flat
+# forest for the live scripts), with a probability calibration curve fitted
+# on out-of-fold predictions of the training rows; the curve is only
+# published if it improves the Brier score on the holdout. --streaming trains a scaler + SGD logistic
+# regression out of core instead, reading batches of --chunk-rows rows from
+# the feature store so memory does not grow with the history.
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, cross_val_predict, KFold
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report
+from sklearn.metrics import classification_report, brier_score_loss, log_loss
+import argparse
 import joblib
 import os
+import numpy as np
+
+from feature_store import load_features
+from forest import export_forest, FlatForest
+from indicators import MODEL_FEATURES
+import training
+import registry
 
 symbols = ['AAPL', 'AMZN', 'GOOGL', 'MSFT', 'SPY']
-all_data = []
 
-for symbol in symbols:
-    df = pd.read_csv(f"data/{symbol}_features.csv", index_col=0, parse_dates=True)
+# --- Features (any indicators.FEATURE_COLUMNS; the published model records its own list)
+features = list(MODEL_FEATURES)
+# plus: you can add 'golden_cross', 'death_cross', etc.
+
+parser = argparse.ArgumentParser(description="Train the price direction model")
+parser.add_argument('--streaming', action='store_true', help="out-of-core SGD training from the feature store")
+parser.add_argument('--chunk-rows', type=int, default=100_000, help="streaming: rows per batch")
+parser.add_argument('--epochs', type=int, default=3, help="streaming: passes over the data")
+parser.add_argument('--workers', type=int, default=None, help="streaming: processes (default: all cores)")
+parser.add_argument('--publish', action='store_true', help="register the model as the live version")
+parser.add_argument('--calibration', choices=['sigmoid', 'isotonic', 'none'], default='sigmoid',
+                    help="probability calibration of the RandomForest (kept only if it helps on the holdout)")
+args = parser.parse_args()
 
-    # Create target: price increase over next 5 mins
-    df['future_close'] = df['Close'].shift(-5)
-    df['target'] = (df['future_close'] > df['Close']).astype(int)
+os.makedirs('models', exist_ok=True)
 
-    # Drop last rows without future_close
-    df.dropna(inplace=True)
+calibration = None
+if args.streaming:
+    # --- Train (time-forward holdout: the last 20% of each symbol's rows)
+    model = training.fit_streaming(symbols, features, args.chunk_rows, args.epochs, args.workers)
 
-    # Add symbol column (if want to train single model over all symbols)
-    df['symbol'] = symbol
+    # --- Evaluate
+    cm = training.evaluate_streaming(model, symbols, features, args.chunk_rows)
+    print(training.report(cm))
 
-    all_data.append(df)
+    # --- Save model (forest.load_model falls back to joblib for it)
+    joblib.dump(model, 'models/price_direction_sgd.pkl')
+    print("✅ Model saved as models/price_direction_sgd.pkl")
+    metrics = {'accuracy': float(np.trace(cm) / max(cm.sum(), 1)), 'test_rows': int(cm.sum())}
+else:
+    all_data = []
 
-# Combine all
-df_all = pd.concat(all_data)
+    for symbol in symbols:
+        # Target: price increase over next 5 mins (rows without a future close dropped)
+        df = training.add_target(load_features(symbol))
 
-# --- Features
-features = ['Close', 'Volume', 'SMA_20', 'SMA_50', 'RSI_14', 'MACD', 'MACD_signal', 'MACD_hist']
-# plus: you can add 'golden_cross', 'death_cross', etc.
+        # Add symbol column (if want to train single model over all symbols)
+        df['symbol'] = symbol
 
-X = df_all[features]
-y = df_all['target']
+        all_data.append(df)
 
-# --- Split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    # Combine all
+    df_all = pd.concat(all_data)
 
-# --- Train
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    X = df_all[features]
+    y = df_all['target']
 
-# --- Evaluate
-y_pred = model.predict(X_test)
-print(classification_report(y_test, y_pred))
+    # --- Split
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
 
-# --- Save model
-os.makedirs('models', exist_ok=True)
-joblib.dump(model, 'models/price_direction_rf.pkl')
-print("✅ Model saved as models/price_direction_rf.pkl")
+    # --- Train
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X_train, y_train)
+
+    # --- Evaluate
+    y_pred = model.predict(X_test)
+    print(classification_report(y_test, y_pred))
+
+    # --- Save model
+    joblib.dump(model, 'models/price_direction_rf.pkl')
+    print("✅ Model saved as models/price_direction_rf.pkl")
+
+    # --- Export flattened forest for the live scripts & check it matches sklearn
+    export_forest(model, 'models/price_direction_rf.npz')
+    flat = FlatForest.load('models/price_direction_rf.npz')
+    max_diff = np.abs(flat.predict_proba(X_test.to_numpy()) - model.predict_proba(X_test)).max()
+    if max_diff > 1e-9:
+        raise RuntimeError(f"Flat forest disagrees with sklearn (max abs diff {max_diff:.3g})")
+    print(f"✅ Flat forest saved as models/price_direction_rf.npz (parity max abs diff {max_diff:.1g})")
+    metrics = {'accuracy': float((y_pred == y_test).mean()), 'test_rows': int(len(y_test))}
+
+    # --- Calibration: fitted on out-of-fold P(up) of the training rows (each
+    # from a forest that didn't see the row), judged on the untouched holdout
+    if args.calibration != 'none':
+        up = list(model.classes_).index(1)
+        oof = cross_val_predict(RandomForestClassifier(n_estimators=100, random_state=42), X_train, y_train,
+                                cv=KFold(3), method='predict_proba')[:, up]
+        curve = registry.fit_calibration(oof, y_train, args.calibration)
+        raw = model.predict_proba(X_test)[:, up]
+        metrics['brier'] = float(brier_score_loss(y_test, raw))
+        metrics['log_loss'] = float(log_loss(y_test, raw, labels=[0, 1]))
+        if curve is None:
+            print("⚠️ Calibration skipped: too few rows or no increasing fit")
+        else:
+            calibrated = registry.apply_calibration(raw, curve)
+            brier = float(brier_score_loss(y_test, calibrated))
+            print(f"Calibration ({args.calibration}): holdout Brier {metrics['brier']:.4f} -> {brier:.4f}, "
+                  f"log loss {metrics['log_loss']:.4f} -> {log_loss(y_test, calibrated, labels=[0, 1]):.4f}")
+            if brier < metrics['brier']:
+                calibration = dict(curve, method=args.calibration)
+                metrics['brier_calibrated'] = brier
+            else:
+                print("⚠️ Calibration doesn't improve the holdout Brier score: not used")
+
+# --- Register as the next version; running live loops pick it up without a restart
+if args.publish:
+    version = registry.publish(model, features, metrics=metrics, calibration=calibration)
+    print(f"✅ Published {registry.DEFAULT_NAME} {version} (now current)")
@@ -0,0 +1,179 @@
+# Training data & out-of-core fitting for train_model.py
+#
+# add_target() is the labelling rule (price higher `horizon` bars later).
+# iter_batches() streams (X, y) batches straight from the feature store: one
+# day partition per symbol at a time, targets computed across partition
+# boundaries by holding back the last `horizon` rows, symbols interleaved so a
+# batch mixes the universe. Each symbol's last `test_size` rows are the
+# time-forward holdout.
+#
+# fit_streaming() trains a scaler + SGD logistic regression with data never
+# held beyond a batch per worker. Symbols are sharded across processes: each
+# epoch every worker runs partial_fit over its shard starting from the current
+# weights, and the weights are averaged (weighted by rows seen). The scaler
+# statistics are merged from per-shard moments the same way.
+import os
+import copy
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from feature_store import FeatureStore, STORE_ROOT
+
+TARGET_HORIZON = 5      # bars ahead the target looks
+CLASSES = np.array([0, 1])
+
+
+def add_target(df, horizon=TARGET_HORIZON):
+    # Create target: price increase over the next `horizon` bars; drop rows without a future close
+    df['future_close'] = df['Close'].shift(-horizon)
+    df['target'] = (df['future_close'] > df['Close']).astype(int)
+    return df.dropna()
+
+
+def _symbol_pieces(store, symbol, features, split, test_size, horizon):
+    # (X, y) per day partition of one symbol, restricted to the train or test rows
+    n_target = max(store.count('features', symbol) - horizon, 0)
+    cutoff = int(n_target * (1 - test_size))
+    lo, hi = (0, cutoff) if split == 'train' else (cutoff, n_target) if split == 'test' else (0, n_target)
+    columns = list(dict.fromkeys(features + ['Close']))
+    carry, done = None, 0   # held-back rows waiting for their future close; target rows emitted so far
+    for day in store.iter_partitions('features', symbol, columns):
+        block = day if carry is None else pd.concat([carry, day])
+        close = block['Close'].to_numpy(dtype=np.float64)
+        n = max(len(block) - horizon, 0)
+        carry = block.iloc[n:]
+        if not n:
+            continue
+        y = (close[horizon:] > close[:n]).astype(np.int8)
+        X = block[features].iloc[:n]
+        # Keep only the rows of this split
+        a, b = max(lo - done, 0), min(hi - done, n)
+        done += n
+        if a < b:
+            yield X.iloc[a:b].astype(np.float32), y[a:b]
+        if done >= hi:
+            return
+
+
+def iter_batches(symbols, features, chunk_rows=100_000, split='train', test_size=0.2,
+                 horizon=TARGET_HORIZON, root=STORE_ROOT):
+    store = FeatureStore(root)
+    missing = [s for s in symbols if not store.has('features', s)]
+    if missing:
+        raise FileNotFoundError(f"No features in {root}/ for {missing}: run create_features.py first")
+    streams = [_symbol_pieces(store, s, features, split, test_size, horizon) for s in symbols]
+    xs, ys, rows = [], [], 0
+    while streams:
+        # Round-robin over symbols, one partition each
+        for stream in list(streams):
+            piece = next(stream, None)
+            if piece is None:
+                streams.remove(stream)
+                continue
+            xs.append(piece[0])
+            ys.append(piece[1])
+            rows += len(piece[1])
+            if rows >= chunk_rows:
+                yield pd.concat(xs), np.concatenate(ys)
+                xs, ys, rows = [], [], 0
+    if rows:
+        yield pd.concat(xs), np.concatenate(ys)
+
+
+# --- Workers (one shard of symbols each)
+def _moments(symbols, features, chunk_rows, test_size, root):
+    # Row count, mean and sum of squared deviations of the shard's training rows
+    n, mean, m2 = 0, np.zeros(len(features)), np.zeros(len(features))
+    for X, _ in iter_batches(symbols, features, chunk_rows, 'train', test_size, root=root):
+        x = X.to_numpy(dtype=np.float64)
+        n, mean, m2 = _merge_moments((n, mean, m2), (len(x), x.mean(axis=0), ((x - x.mean(axis=0)) ** 2).sum(axis=0)))
+    return n, mean, m2
+
+
+def _merge_moments(a, b):
+    # Chan et al. pairwise update
+    (na, ma, m2a), (nb, mb, m2b) = a, b
+    n = na + nb
+    if not n:
+        return a
+    delta = mb - ma
+    return n, ma + delta * nb / n, m2a + m2b + delta ** 2 * na * nb / n
+
+
+def _sgd_epoch(clf, symbols, scaler, features, chunk_rows, test_size, root):
+    rows = 0
+    for X, y in iter_batches(symbols, features, chunk_rows, 'train', test_size, root=root):
+        clf.partial_fit(scaler.transform(X), y, classes=CLASSES)
+        rows += len(y)
+    return clf, rows
+
+
+def _shards(symbols, workers):
+    return [symbols[i::workers] for i in range(workers) if symbols[i::workers]]
+
+
+def fit_streaming(symbols, features, chunk_rows=100_000, epochs=3, workers=None,
+                  test_size=0.2, random_state=42, root=STORE_ROOT):
+    workers = min(workers or os.cpu_count() or 1, len(symbols))
+    shards = _shards(list(symbols), workers)
+    opts = dict(features=features, chunk_rows=chunk_rows, test_size=test_size, root=root)
+
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        # Pass 1: scaler statistics
+        n, mean, m2 = 0, np.zeros(len(features)), np.zeros(len(features))
+        for part in pool.map(partial(_moments, **opts), shards):
+            n, mean, m2 = _merge_moments((n, mean, m2), part)
+        if not n:
+            raise ValueError("No training rows")
+        # Fitted StandardScaler built from the merged moments
+        scaler = StandardScaler()
+        scaler.n_features_in_ = len(features)
+        scaler.feature_names_in_ = np.asarray(features, dtype=object)
+        scaler.n_samples_seen_ = n
+        scaler.mean_, scaler.var_ = mean, m2 / n
+        scale = np.sqrt(scaler.var_)
+        scaler.scale_ = np.where(scale == 0, 1.0, scale)
+
+        # Passes 2..: parallel partial_fit per shard, weights averaged after every epoch
+        clf = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=random_state)
+        for epoch in range(epochs):
+            results = list(pool.map(partial(_sgd_epoch, scaler=scaler, **opts),
+                                    [copy.deepcopy(clf) for _ in shards], shards))
+            results = [(c, r) for c, r in results if r]
+            total = sum(r for _, r in results)
+            clf = copy.deepcopy(results[0][0])
+            clf.coef_ = sum(c.coef_ * r for c, r in results) / total
+            clf.intercept_ = sum(c.intercept_ * r for c, r in results) / total
+            clf.t_ = sum(c.t_ * r for c, r in results) / total
+            print(f"  epoch {epoch + 1}/{epochs}: {total} rows across {len(results)} workers")
+
+    return Pipeline([('scale', scaler), ('clf', clf)])
+
+
+def evaluate_streaming(model, symbols, features, chunk_rows=100_000, test_size=0.2, root=STORE_ROOT):
+    # Confusion matrix over the holdout, accumulated batch by batch
+    cm = np.zeros((2, 2), dtype=np.int64)
+    for X, y in iter_batches(symbols, features, chunk_rows, 'test', test_size, root=root):
+        pred = model.predict(X)
+        np.add.at(cm, (y, pred), 1)
+    return cm
+
+
+def report(cm):
+    # classification_report-style summary from a 2x2 confusion matrix
+    lines = [f"{'':>12}{'precision':>10}{'recall':>10}{'f1-score':>10}{'support':>10}"]
+    for k in (0, 1):
+        tp, support, predicted = cm[k, k], cm[k].sum(), cm[:, k].sum()
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        lines.append(f"{k:>12}{precision:>10.2f}{recall:>10.2f}{f1:>10.2f}{support:>10}")
+    total = cm.sum()
+    lines.append(f"{'accuracy':>12}{'':>20}{(np.trace(cm) / total if total else 0.0):>10.2f}{total:>10}")
+    return "\n".join(lines)
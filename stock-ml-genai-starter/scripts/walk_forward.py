@@ -0,0 +1,160 @@
+# Walk-forward validation of the price direction model
+#
+# Each symbol gets its own time-ordered folds: the last folds x test-bars rows
+# are split into consecutive test windows, and every fold trains on the rows
+# before its window (expanding, or the last --train-bars rows), leaving a gap
+# of TARGET_HORIZON bars so no training label looks into the test window.
+# A symbol's feature matrix and targets are built once and cached as .npy
+# under backtests/wf_cache/, keyed by the feature list and a fingerprint of
+# the stored data (size and mtime of every file read, so any rewrite of the
+# features invalidates the entry); fold workers memory-map them and only slice. All
+# (symbol, fold) pairs are trained and scored in parallel processes.
+#
+# Usage: python scripts/walk_forward.py [--folds 5] [--test-bars N] [--train-bars N] [--workers N]
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+
+import training
+from feature_store import FeatureStore, STORE_ROOT, INDEX_FILE, SCHEMA_FILE, load_features
+from indicators import MODEL_FEATURES
+
+symbols = ['AAPL', 'AMZN', 'GOOGL', 'MSFT', 'SPY']
+features = list(MODEL_FEATURES)
+out_folder = 'backtests'
+cache_folder = os.path.join(out_folder, 'wf_cache')
+
+
+def make_folds(n, n_folds, test_bars=None, train_bars=None, gap=training.TARGET_HORIZON, min_train=100):
+    # (train_start, train_end, test_start, test_end) row bounds, oldest fold first
+    test_bars = test_bars or n // (n_folds + 1)
+    folds = []
+    for k in range(n_folds):
+        test_start = n - (n_folds - k) * test_bars
+        train_end = test_start - gap
+        train_start = 0 if train_bars is None else max(0, train_end - train_bars)
+        if test_start < 0 or train_end - train_start < min_train:
+            continue
+        folds.append((train_start, train_end, test_start, test_start + test_bars))
+    return folds
+
+
+def _fingerprint(symbol, columns, root=STORE_ROOT, data_folder='data'):
+    # Cheap identity of the stored features: size + mtime of every partition
+    # file the matrix is read from (partitions are rewritten as new versions on
+    # every write), or of the CSV
+    store = FeatureStore(root)
+    if store.has('features', symbol):
+        sym_dir = os.path.join(root, 'features', symbol)
+        files = [os.path.join(sym_dir, SCHEMA_FILE)] + [
+            os.path.join(store.partition_dir('features', symbol, day), name)
+            for day in store.partitions('features', symbol)
+            for name in [INDEX_FILE] + [f"{c}.npy" for c in columns]]
+        stats = [os.stat(path) for path in files]
+        return ['store'] + [[os.path.relpath(path, sym_dir), st.st_size, st.st_mtime_ns]
+                            for path, st in zip(files, stats)]
+    st = os.stat(os.path.join(data_folder, f"{symbol}_features.csv"))
+    return ['csv', st.st_size, st.st_mtime_ns]
+
+
+def cached_matrix(symbol, features, horizon=training.TARGET_HORIZON):
+    # Paths of the symbol's (X float32, y int8) .npy files, building them on a cache miss
+    columns = list(dict.fromkeys(features + ['Close']))
+    key = json.dumps([symbol, features, horizon, _fingerprint(symbol, columns)])
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    x_path = os.path.join(cache_folder, f"{symbol}_{digest}_X.npy")
+    y_path = os.path.join(cache_folder, f"{symbol}_{digest}_y.npy")
+    if not (os.path.exists(x_path) and os.path.exists(y_path)):
+        df = training.add_target(load_features(symbol, columns=columns), horizon)
+        os.makedirs(cache_folder, exist_ok=True)
+        # Temp file + rename, X last: an interrupted build never leaves a usable-looking entry
+        for path, arr in ((y_path, df['target'].to_numpy(dtype=np.int8)),
+                          (x_path, df[features].to_numpy(dtype=np.float32))):
+            with open(f"{path}.tmp", 'wb') as f:
+                np.save(f, arr)
+            os.replace(f"{path}.tmp", path)
+    return x_path, y_path
+
+
+def run_fold(symbol, fold, bounds, x_path, y_path, model_params):
+    t0 = time.perf_counter()
+    X = np.load(x_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    train_start, train_end, test_start, test_end = bounds
+    X_train, y_train = np.asarray(X[train_start:train_end]), np.asarray(y[train_start:train_end])
+    X_test, y_test = np.asarray(X[test_start:test_end]), np.asarray(y[test_start:test_end])
+    t1 = time.perf_counter()
+
+    model = RandomForestClassifier(**model_params)
+    model.fit(X_train, y_train)
+    t2 = time.perf_counter()
+    proba = model.predict_proba(X_test)
+    t3 = time.perf_counter()
+
+    up = list(model.classes_).index(1) if 1 in model.classes_ else None
+    p_up = proba[:, up] if up is not None else np.zeros(len(X_test))
+    pred = (p_up > 0.5).astype(np.int8)
+    both = len(np.unique(y_test)) == 2
+    return {
+        'symbol': symbol, 'fold': fold,
+        'train_rows': train_end - train_start, 'test_rows': test_end - test_start,
+        'accuracy': accuracy_score(y_test, pred),
+        'precision': precision_score(y_test, pred, zero_division=0),
+        'recall': recall_score(y_test, pred, zero_division=0),
+        'f1': f1_score(y_test, pred, zero_division=0),
+        'auc': roc_auc_score(y_test, p_up) if both else np.nan,
+        'up_rate': float(y_test.mean()),
+        'load_s': t1 - t0, 'fit_s': t2 - t1, 'predict_s': t3 - t2,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Walk-forward validation with parallel folds")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--test-bars', type=int, default=None, help="rows per test window (default: n / (folds + 1))")
+    parser.add_argument('--train-bars', type=int, default=None, help="rolling train window (default: expanding)")
+    parser.add_argument('--min-train', type=int, default=100, help="skip folds with fewer training rows")
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    model_params = {'n_estimators': args.trees, 'random_state': 42, 'n_jobs': 1}
+    os.makedirs(out_folder, exist_ok=True)
+    t0 = time.perf_counter()
+
+    tasks = []
+    for symbol in symbols:
+        x_path, y_path = cached_matrix(symbol, features)
+        n = len(np.load(y_path, mmap_mode='r'))
+        for fold, bounds in enumerate(make_folds(n, args.folds, args.test_bars, args.train_bars,
+                                                  min_train=args.min_train)):
+            tasks.append((symbol, fold, bounds, x_path, y_path, model_params))
+    t_prep = time.perf_counter() - t0
+    print(f"Prepared {len(tasks)} folds for {len(symbols)} symbols in {t_prep:.2f}s")
+    if not tasks:
+        raise SystemExit("No fold has enough training rows: lower --min-train or --folds")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_fold, *task) for task in tasks]
+        for future in as_completed(futures):
+            r = future.result()
+            results.append(r)
+            print(f"  {r['symbol']} fold {r['fold']}: acc={r['accuracy']:.3f} auc={r['auc']:.3f} "
+                  f"fit={r['fit_s']:.2f}s")
+
+    report = pd.DataFrame(results).sort_values(['symbol', 'fold']).reset_index(drop=True)
+    report.to_csv(f"{out_folder}/walk_forward.csv", index=False)
+    summary = report.groupby('symbol')[['accuracy', 'precision', 'recall', 'f1', 'auc', 'fit_s']].mean()
+    print(summary.round(4).to_string())
+    print(f"Mean accuracy {report['accuracy'].mean():.4f} | AUC {report['auc'].mean():.4f} | "
+          f"wall {time.perf_counter() - t0:.1f}s (prep {t_prep:.2f}s)")
+    print(f"✅ Saved per-fold results to {out_folder}/walk_forward.csv")